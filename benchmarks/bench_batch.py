@@ -0,0 +1,115 @@
+"""Batch model benchmarks over 10, 1e4 and 1e6 models."""
+import numpy as np
+from conjugate_prior import (BetaBinomialBatch, GammaExponentialBatch, GammaPoissonBatch, NormalNormalKnownVarBatch,
+                             InvGammaNormalKnownMeanBatch, DirichletMultinomialBatch)
+
+N_MODELS = [10, 10000, 1000000]
+
+
+class _BatchSuite:
+    params = N_MODELS
+    param_names = ["n_models"]
+
+    def setup(self, n):
+        rng = np.random.default_rng(0)
+        self.a = rng.integers(1, 100, n).astype(float)
+        self.b = rng.integers(1, 100, n).astype(float)
+        self.unit = rng.random(n)
+        self.counts = rng.poisson(3.0, n)
+
+
+class BetaBinomialBatchSuite(_BatchSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = BetaBinomialBatch(self.a, self.b)
+
+    def time_update(self, n):
+        self.model.update(self.counts, self.counts)
+
+    def time_mean(self, n):
+        self.model.mean()
+
+    def time_cdf(self, n):
+        self.model.cdf(self.unit)
+
+    def time_percentile(self, n):
+        self.model.percentile(0.95)
+
+    def time_predict(self, n):
+        self.model.predict(self.counts, self.counts)
+
+    def time_sample(self, n):
+        self.model.sample()
+
+
+class GammaExponentialBatchSuite(_BatchSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = GammaExponentialBatch(self.a, self.b)
+
+    def time_update(self, n):
+        self.model.update(self.counts, self.b)
+
+    def time_cdf(self, n):
+        self.model.cdf(self.unit + 0.5)
+
+    def time_percentile(self, n):
+        self.model.percentile(0.95)
+
+    def time_sample(self, n):
+        self.model.sample()
+
+
+class GammaPoissonBatchSuite(_BatchSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = GammaPoissonBatch(self.a, self.b)
+
+    def time_predict(self, n):
+        self.model.predict(self.counts)
+
+
+class NormalNormalKnownVarBatchSuite(_BatchSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = NormalNormalKnownVarBatch(1.0, self.unit, 1.0)
+
+    def time_update(self, n):
+        self.model.update(self.counts, self.a)
+
+    def time_cdf(self, n):
+        self.model.cdf(self.unit)
+
+    def time_percentile(self, n):
+        self.model.percentile(0.95)
+
+
+class InvGammaNormalKnownMeanBatchSuite(_BatchSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = InvGammaNormalKnownMeanBatch(self.a, self.b)
+
+    def time_update(self, n):
+        self.model.update(self.counts, self.a)
+
+    def time_cdf(self, n):
+        self.model.cdf(self.unit + 0.5)
+
+    def time_percentile(self, n):
+        self.model.percentile(0.95)
+
+
+class DirichletMultinomialBatchSuite:
+    params = [10, 10000, 100000]
+    param_names = ["n_models"]
+
+    def setup(self, n):
+        rng = np.random.default_rng(0)
+        self.model = DirichletMultinomialBatch(rng.integers(1, 20, (n, 10)).astype(float))
+        self.weights = np.linspace(0, 1, 10)
+
+    def time_mean(self, n):
+        self.model.mean()
+
+    def time_cdf_beta(self, n):
+        self.model.cdf(self.weights, 0.5, method="beta")
@@ -0,0 +1,76 @@
+"""Stress benchmarks for ConcurrentRanker (mixed rank/ingest throughput as threads are added)
+and ShardedIngest (ingest throughput as worker processes are added).
+
+Every run also checks that no ingested event was lost or misaligned under contention.
+"""
+import threading
+import time
+import numpy as np
+from conjugate_prior import BetaBinomialRanker, ConcurrentRanker, DeltaCoordinator, ShardedIngest
+
+N_ARMS = 100000
+DURATION = 1.0
+
+
+class ConcurrentRankerSuite:
+    params = [1, 2, 4, 8]
+    param_names = ["n_threads"]
+
+    def setup(self, n_threads):
+        self.ranker = ConcurrentRanker(BetaBinomialRanker(N_ARMS), max_staleness=0.01)
+        rng = np.random.default_rng(0)
+        self.slots = rng.integers(0, N_ARMS, 10000)
+        self.ranker.rank_by_ucb(k=10)
+
+    def _worker(self, seed, counts, stop):
+        rng = np.random.default_rng(seed)
+        ops = events = 0
+        while not stop.is_set():
+            if rng.random() < 0.1:
+                self.ranker.ingest(self.slots, 1, 1)
+                events += len(self.slots)
+            else:
+                self.ranker.rank_by_ucb(k=10)
+            ops += 1
+        counts[seed] = (ops, events)
+
+    def track_ops_per_second(self, n_threads):
+        counts = {}
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._worker, args=(i, counts, stop)) for i in range(n_threads)]
+        for t in threads:
+            t.start()
+        time.sleep(DURATION)
+        stop.set()
+        for t in threads:
+            t.join()
+        events = sum(e for _, e in counts.values())
+        positives = self.ranker.ranker.positives.sum() - N_ARMS
+        if positives != events:
+            raise AssertionError("lost updates: {} events, {} recorded".format(events, positives))
+        return sum(o for o, _ in counts.values()) / DURATION
+    track_ops_per_second.unit = "ops/s"
+
+
+class ShardedIngestSuite:
+    params = [1, 2, 4]
+    param_names = ["n_workers"]
+
+    def setup(self, n_workers):
+        rng = np.random.default_rng(0)
+        self.names = np.array(["arm%d" % i for i in range(N_ARMS)])[rng.integers(0, N_ARMS, 1000000)]
+        self.clicks = rng.random(len(self.names)) < 0.1
+
+    def track_events_per_second(self, n_workers):
+        start = time.perf_counter()
+        with DeltaCoordinator(BetaBinomialRanker()) as coordinator:
+            with ShardedIngest(coordinator, n_workers=n_workers) as workers:
+                for i in range(0, len(self.names), 50000):
+                    workers.ingest(self.names[i:i + 50000], self.clicks[i:i + 50000], ~self.clicks[i:i + 50000])
+        elapsed = time.perf_counter() - start
+        ranker = coordinator.ranker
+        recorded = ranker.positives.sum() + ranker.negatives.sum() - 2 * len(ranker)
+        if recorded != len(self.names):
+            raise AssertionError("lost updates: {} events, {} recorded".format(len(self.names), recorded))
+        return len(self.names) / elapsed
+    track_events_per_second.unit = "events/s"
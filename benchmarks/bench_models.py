@@ -0,0 +1,248 @@
+"""Scalar model benchmarks: update/pdf/cdf/percentile/predict/sample at 1, 1e3 and 1e6 observations."""
+import numpy as np
+from conjugate_prior import (BetaBinomial, BetaBernoulli, GammaExponential, GammaPoisson, NormalNormalKnownVar,
+                             NormalLogNormalKnownVar, InvGammaNormalKnownMean, InvGammaWeibullKnownShape,
+                             DirichletMultinomial, SparseDirichletMultinomial, SufficientStats)
+
+N_OBS = [1, 1000, 1000000]
+
+
+class _ModelSuite:
+    params = N_OBS
+    param_names = ["n_obs"]
+
+    def setup(self, n):
+        rng = np.random.default_rng(0)
+        self.rng = rng
+        self.unit = rng.random(n)
+        self.positive = rng.exponential(2.0, n) + 1e-3
+        self.normal = rng.normal(1.0, 2.0, n)
+        self.counts = rng.poisson(3.0, n)
+
+
+class BetaBinomialSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = BetaBinomial(30.0, 70.0)
+        self.clicks = self.unit < 0.3
+
+    def time_update(self, n):
+        self.model.update(self.clicks)
+
+    def time_pdf(self, n):
+        self.model.pdf(self.unit)
+
+    def time_cdf(self, n):
+        self.model.cdf(self.unit)
+
+    def time_percentile(self, n):
+        self.model.percentile(self.unit)
+
+    def time_predict(self, n):
+        self.model.predict(self.counts, self.counts)
+
+    def time_sample(self, n):
+        self.model.sample(n)
+
+
+class BetaBernoulliSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = BetaBernoulli(30.0, 70.0)
+        self.clicks = self.unit < 0.3
+
+    def time_update(self, n):
+        self.model.update(self.clicks)
+
+    def time_sample(self, n):
+        self.model.sample(n)
+
+
+class GammaExponentialSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = GammaExponential(2.0, 4.0)
+
+    def time_update(self, n):
+        self.model.update(self.positive)
+
+    def time_pdf(self, n):
+        self.model.pdf(self.positive)
+
+    def time_cdf(self, n):
+        self.model.cdf(self.positive)
+
+    def time_percentile(self, n):
+        self.model.percentile(self.unit)
+
+    def time_predict(self, n):
+        self.model.predict(self.positive)
+
+    def time_sample(self, n):
+        self.model.sample(n)
+
+
+class GammaPoissonSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = GammaPoisson(6.0, 2.0)
+
+    def time_update(self, n):
+        self.model.update(self.counts)
+
+    def time_predict(self, n):
+        self.model.predict(self.counts)
+
+    def time_sample(self, n):
+        self.model.sample(n)
+
+
+class NormalNormalKnownVarSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = NormalNormalKnownVar(4.0, 0.0, 1.0)
+        self.stats = SufficientStats().add(self.normal)
+
+    def time_update(self, n):
+        self.model.update(self.normal)
+
+    def time_update_sufficient_stats(self, n):
+        self.model.update(self.stats)
+
+    def time_pdf(self, n):
+        self.model.pdf(self.normal)
+
+    def time_cdf(self, n):
+        self.model.cdf(self.normal)
+
+    def time_percentile(self, n):
+        self.model.percentile(self.unit)
+
+    def time_predict(self, n):
+        self.model.predict(self.normal)
+
+    def time_sample(self, n):
+        self.model.sample(n)
+
+
+class NormalLogNormalKnownVarSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = NormalLogNormalKnownVar(1.0, 0.0, 1.0)
+
+    def time_update(self, n):
+        self.model.update(self.positive)
+
+
+class InvGammaNormalKnownMeanSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = InvGammaNormalKnownMean(3.0, 2.0)
+
+    def time_update(self, n):
+        self.model.update(self.normal)
+
+    def time_pdf(self, n):
+        self.model.pdf(self.positive)
+
+    def time_cdf(self, n):
+        self.model.cdf(self.positive)
+
+    def time_percentile(self, n):
+        self.model.percentile(self.unit)
+
+    def time_sample(self, n):
+        self.model.sample(n)
+
+
+class InvGammaWeibullKnownShapeSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = InvGammaWeibullKnownShape(3.0, 2.0, 1.5)
+
+    def time_update(self, n):
+        self.model.update(self.positive)
+
+    def time_sample(self, n):
+        self.model.sample(n)
+
+
+class SufficientStatsSuite(_ModelSuite):
+    def time_add(self, n):
+        SufficientStats(shape=1.5).add(self.positive)
+
+
+class DirichletMultinomialSuite(_ModelSuite):
+    def setup(self, n):
+        super().setup(n)
+        self.model = DirichletMultinomial(np.arange(1.0, 11.0))
+        self.events = self.rng.integers(0, 10, n).tolist()
+        self.weights = self.rng.random(10)
+
+    def time_update(self, n):
+        self.model.update(self.events)
+
+    def time_sample(self, n):
+        self.model.sample(n)
+
+    def time_select(self, n):
+        self.model.select(n, rng=0)
+
+
+class PredictiveSamplingSuite:
+    """1e6 posterior-predictive draws as (1000 parameter draws, 1000 observations), into a reused buffer."""
+    params = ["BetaBernoulli", "GammaExponential", "GammaPoisson", "NormalNormalKnownVar",
+              "InvGammaNormalKnownMean", "InvGammaWeibullKnownShape", "DirichletMultinomial"]
+    param_names = ["model"]
+
+    def setup(self, name):
+        self.model = {"BetaBernoulli": lambda: BetaBernoulli(30.0, 70.0),
+                      "GammaExponential": lambda: GammaExponential(5.0, 10.0),
+                      "GammaPoisson": lambda: GammaPoisson(5.0, 2.0),
+                      "NormalNormalKnownVar": lambda: NormalNormalKnownVar(4.0, 1.0, 0.5),
+                      "InvGammaNormalKnownMean": lambda: InvGammaNormalKnownMean(10.0, 9.0),
+                      "InvGammaWeibullKnownShape": lambda: InvGammaWeibullKnownShape(50.0, 400.0, 2.0),
+                      "DirichletMultinomial": lambda: DirichletMultinomial(np.arange(1.0, 11.0))}[name]()
+        self.rng = np.random.default_rng(0)
+        dtype = np.int64 if name in ("GammaPoisson", "DirichletMultinomial") else float
+        self.out = np.empty((1000, 1000), dtype=dtype)
+
+    def time_sample_predictive(self, name):
+        self.model.sample_predictive((1000, 1000), self.rng, out=self.out)
+
+
+class SparseDirichletMultinomialSuite:
+    """Clicks over a 2M-item catalog: 20-category updates and reads on 1e5 observed items."""
+    def setup(self):
+        rng = np.random.default_rng(0)
+        self.model = SparseDirichletMultinomial(2000000, base=0.01)
+        self.model.update(rng.integers(0, 2000000, 100000))
+        self.batch = rng.integers(0, 2000000, 20)
+
+    def time_update_20(self):
+        self.model.update(self.batch)
+
+    def time_top_k(self):
+        self.model.top_k(10)
+
+    def time_select_100(self):
+        self.model.select(100, rng=0)
+
+    def time_sample(self):
+        self.model.sample(10, rng=0)
+
+
+class DirichletCdfSuite:
+    params = ["exact", "beta", "mc"]
+    param_names = ["method"]
+
+    def setup(self, method):
+        self.model = DirichletMultinomial(np.arange(1.0, 11.0))
+        self.weights = np.linspace(0, 1, 10)
+        self.model.cdf(self.weights, 0.5, method)
+
+    def time_cdf(self, method):
+        self.model.cdf(self.weights, 0.5, method)
+
+    def time_posterior(self, method):
+        self.model.posterior(self.weights, 0.4, 0.6, method)
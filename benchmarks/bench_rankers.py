@@ -0,0 +1,177 @@
+"""Ranker benchmarks over 10, 1e4 and 1e6 arms."""
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from conjugate_prior import (BetaBinomialRanker, GammaExponentialRanker, enable_instrumentation,
+                             disable_instrumentation)
+
+N_ARMS = [10, 10000, 1000000]
+N_EVENTS = 100000
+
+
+class BetaBinomialRankerSuite:
+    params = N_ARMS
+    param_names = ["n_arms"]
+
+    def setup(self, n):
+        rng = np.random.default_rng(0)
+        self.ranker = BetaBinomialRanker(n, prior=0.1)
+        self.slots = rng.integers(0, n, N_EVENTS)
+        self.clicks = rng.random(N_EVENTS) < 0.1
+        self.ranker.ingest(self.slots, self.clicks, ~self.clicks)
+        self.names = [str(i) for i in self.slots[:1000]]
+        self.path = tempfile.mkdtemp()
+        self.ranker.save(self.path)
+        # fit_prior needs arms whose rates really differ, each with some trials
+        trials = rng.integers(20, 200, n)
+        hits = rng.binomial(trials, rng.beta(2.0, 18.0, n))
+        self.fit_ranker = BetaBinomialRanker(n, prior=0.1)
+        self.fit_ranker.ingest(np.arange(n), hits, trials - hits)
+
+    def time_rank_by_mle(self, n):
+        self.ranker.rank_by_mle()
+
+    def time_rank_by_ucb(self, n):
+        self.ranker.rank_by_ucb()
+
+    def time_rank_by_ucb_top100(self, n):
+        self.ranker.rank_by_ucb(k=100)
+
+    def time_rank_by_ucb_cold(self, n):
+        # discount() touches every arm (the coefficient is 1), forcing a full re-score
+        self.ranker.discount()
+        self.ranker.rank_by_ucb(k=100)
+
+    def time_rank_by_ucb_after_100_events(self, n):
+        self.ranker.ingest(self.slots[:100], self.clicks[:100], ~self.clicks[:100])
+        self.ranker.rank_by_ucb(k=100)
+
+    def time_ingest(self, n):
+        self.ranker.ingest(self.slots, self.clicks, ~self.clicks)
+
+    def time_update_1000_events(self, n):
+        for name in self.names:
+            self.ranker.update(name, 1, 0)
+
+    def time_select_100(self, n):
+        self.ranker.select(100, rng=0)
+
+    def time_load_mmap(self, n):
+        BetaBinomialRanker.load(self.path)
+
+    def time_fit_prior(self, n):
+        self.fit_ranker.fit_prior()
+
+
+class QuantileEngineSuite:
+    """Cold ``rank_by_ucb`` (every arm re-scored) per quantile engine."""
+    params = ([10000, 1000000], ["exact", "normal", "table"])
+    param_names = ["n_arms", "quantile"]
+
+    def setup(self, n, quantile):
+        rng = np.random.default_rng(0)
+        self.ranker = BetaBinomialRanker(n, prior=0.1, quantile=quantile)
+        clicks = rng.random(N_EVENTS) < 0.1
+        self.ranker.ingest(rng.integers(0, n, N_EVENTS), clicks, ~clicks)
+        # builds the interpolation table outside the timed region
+        self.ranker.rank_by_ucb(k=1)
+
+    def time_rank_by_ucb_cold(self, n, quantile):
+        self.ranker.discount()
+        self.ranker.rank_by_ucb(k=100)
+
+
+class ArmComparisonSuite:
+    """A/B/n dashboards: P(best) and the pairwise win matrix over a few hundred arms."""
+    params = [10, 300]
+    param_names = ["n_arms"]
+
+    def setup(self, n):
+        rng = np.random.default_rng(0)
+        self.ranker = BetaBinomialRanker(n, prior=0.05)
+        self.decayed = BetaBinomialRanker(n, prior=0.05, half_life=3600.0)
+        slots = rng.integers(0, n, 200 * n)
+        clicks = rng.random(200 * n) < 0.05
+        self.ranker.ingest(slots, clicks, ~clicks)
+        self.decayed.ingest(slots, clicks, ~clicks)
+        self.gamma = GammaExponentialRanker(n, prior=(2.0, 4.0))
+        self.gamma.ingest(slots, rng.exponential(2.0, 200 * n))
+
+    def time_prob_best(self, n):
+        self.ranker.prob_best(rng=0)
+
+    def time_pairwise_win_matrix_exact(self, n):
+        self.ranker.pairwise_win_matrix()
+
+    def time_pairwise_win_matrix_mc(self, n):
+        # decayed counts are not integers, so there is no closed form
+        self.decayed.pairwise_win_matrix(rng=0)
+
+    def time_gamma_pairwise_win_matrix(self, n):
+        self.gamma.pairwise_win_matrix()
+
+
+class InstrumentationSuite:
+    """Hot-path calls with instrumentation disabled and enabled (default recorder)."""
+    params = [False, True]
+    param_names = ["instrumented"]
+
+    def setup(self, instrumented):
+        self.ranker = BetaBinomialRanker(1000, prior=0.1)
+        self.ranker.rank_by_ucb(k=10)
+        if instrumented:
+            enable_instrumentation()
+
+    def teardown(self, instrumented):
+        disable_instrumentation()
+
+    def time_update_1000_events(self, instrumented):
+        for i in range(1000):
+            self.ranker.update("7", 1, 0)
+
+    def time_rank_by_ucb_top10(self, instrumented):
+        self.ranker.rank_by_ucb(k=10)
+
+
+class GammaExponentialRankerSuite:
+    params = N_ARMS
+    param_names = ["n_arms"]
+
+    def setup(self, n):
+        rng = np.random.default_rng(0)
+        self.ranker = GammaExponentialRanker(n, prior=(2.0, 4.0))
+        self.slots = rng.integers(0, n, N_EVENTS)
+        self.durations = rng.exponential(2.0, N_EVENTS)
+        self.ranker.ingest(self.slots, self.durations)
+        # fit_prior needs arms whose rates really differ, each with some events
+        counts = rng.integers(20, 200, n)
+        self.fit_ranker = GammaExponentialRanker(n, prior=(2.0, 4.0))
+        self.fit_ranker.ingest(np.arange(n), rng.gamma(counts, 1.0 / rng.gamma(3.0, 1.0 / 6.0, n)), counts)
+
+    def time_rank_by_mle(self, n):
+        self.ranker.rank_by_mle()
+
+    def time_rank_by_ucb(self, n):
+        self.ranker.rank_by_ucb()
+
+    def time_rank_by_ucb_top100(self, n):
+        self.ranker.rank_by_ucb(k=100)
+
+    def time_ingest(self, n):
+        self.ranker.ingest(self.slots, self.durations)
+
+    def time_fit_prior(self, n):
+        self.fit_ranker.fit_prior()
+
+    def time_select_100(self, n):
+        self.ranker.select(100, rng=0)
+
+
+def track_import_seconds():
+    """Wall time of ``import conjugate_prior`` in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import conjugate_prior; print(time.perf_counter() - t)"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    return min(float(subprocess.check_output([sys.executable, "-c", code], env=env)) for _ in range(3))
+track_import_seconds.unit = "seconds"
@@ -0,0 +1,139 @@
+"""Minimal runner for the asv-style suites in this directory.
+
+    python -m benchmarks.run -o results.json                # run everything
+    python -m benchmarks.run -k Ranker -o new.json -c old.json  # subset, compared to a previous run
+
+Results are written as JSON (seconds per call, or the unit of a ``track_`` benchmark) so runs
+from different commits can be compared with ``--compare``, which reports slowdowns: a drop in a
+throughput unit such as "ops/s" counts as a regression. The same suites can be run with ``asv run``.
+"""
+import argparse
+import importlib
+import inspect
+import itertools
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import timeit
+
+MODULES = ["bench_models", "bench_batch", "bench_rankers", "bench_concurrency"]
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _param_sets(obj):
+    params = getattr(obj, "params", None)
+    if params is None:
+        return [()]
+    if getattr(obj, "param_names", None) and len(obj.param_names) > 1:
+        return list(itertools.product(*params))
+    return [(p,) for p in params]
+
+
+def discover(pattern=None):
+    """Yield (name, callable, args, setup) for every benchmark whose name matches ``pattern``."""
+    for module_name in MODULES:
+        module = importlib.import_module("benchmarks." + module_name)
+        for attr, obj in sorted(vars(module).items()):
+            if attr.startswith("_"):
+                continue
+            if inspect.isclass(obj) and obj.__module__ == module.__name__:
+                methods = [m for m in sorted(vars(obj)) if m.startswith(("time_", "track_"))]
+                for method, args in itertools.product(methods, _param_sets(obj)):
+                    name = "{}.{}.{}({})".format(module_name, attr, method, ", ".join(map(repr, args)))
+                    if pattern is None or re.search(pattern, name):
+                        yield name, obj, method, args
+            elif inspect.isfunction(obj) and attr.startswith(("time_", "track_")):
+                name = "{}.{}()".format(module_name, attr)
+                if pattern is None or re.search(pattern, name):
+                    yield name, None, obj, ()
+
+
+def measure(owner, method, args, repeat):
+    if owner is None:
+        fn, unit = method, getattr(method, "unit", "seconds")
+    else:
+        instance = owner()
+        if hasattr(instance, "setup"):
+            instance.setup(*args)
+        fn = getattr(instance, method)
+        unit = getattr(fn, "unit", "seconds")
+    try:
+        if fn.__name__.startswith("track_"):
+            return {"value": fn(*args), "unit": unit}
+        timer = timeit.Timer(lambda: fn(*args))
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        return {"value": best, "unit": "seconds", "number": number}
+    finally:
+        if owner is not None and hasattr(instance, "teardown"):
+            instance.teardown(*args)
+
+
+def _higher_is_better(unit):
+    # throughput metrics ("ops/s", "events/s"); times and everything else are lower-is-better
+    return unit.endswith("/s")
+
+
+def compare(base, new, threshold):
+    """Print the slowdown of every benchmark in ``new`` relative to ``base`` (>1 is worse) and
+    return the names slower by more than ``threshold``."""
+    regressions = []
+    for name, result in new["results"].items():
+        old = base["results"].get(name)
+        if old is None or not old["value"] or not result["value"]:
+            continue
+        ratio = result["value"] / old["value"]
+        if _higher_is_better(result["unit"]):
+            ratio = 1 / ratio
+        flag = "REGRESSION" if ratio > threshold else ("improved" if ratio < 1 / threshold else "")
+        print("{:>8.2f}x  {:<10} {}".format(ratio, flag, name))
+        if flag == "REGRESSION":
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", help="regex selecting benchmark names")
+    parser.add_argument("-o", "--output", help="write results JSON to this path")
+    parser.add_argument("-c", "--compare", help="results JSON of a previous run to compare against")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="timing repeats (best is kept)")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    parser.add_argument("--import-budget", type=float, help="fail if import conjugate_prior takes longer (seconds)")
+    args = parser.parse_args(argv)
+
+    import numpy
+    import scipy
+    report = {"commit": _git_revision(), "machine": platform.node(), "python": platform.python_version(),
+              "numpy": numpy.__version__, "scipy": scipy.__version__, "results": {}}
+    for name, owner, method, params in discover(args.filter):
+        report["results"][name] = result = measure(owner, method, params, args.repeat)
+        print("{:>12.6g} {:<8} {}".format(result["value"], result["unit"], name), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+    failed = False
+    if args.compare:
+        with open(args.compare) as f:
+            failed = bool(compare(json.load(f), report, args.threshold))
+    if args.import_budget is not None:
+        from benchmarks.bench_rankers import track_import_seconds
+        seconds = track_import_seconds()
+        print("import conjugate_prior: {:.3f}s (budget {:.3f}s)".format(seconds, args.import_budget))
+        failed = failed or seconds > args.import_budget
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,24 @@
+from importlib import import_module as _import_module
 from .dirichlet import *
 from .gamma import *
 from .beta import *
 from .normal import *
 from .invgamma import *
+from .suffstats import *
 from .prior import ConjugatePrior, BetaBinomialRanker, GammaExponentialRanker
+from .concurrency import ConcurrentRanker
+from .instrumentation import MetricsRecorder, enable_instrumentation, disable_instrumentation
 __version__ = '0.85'
+
+# these pull in asyncio / multiprocessing, so they are imported on first access; __all__ keeps
+# them in ``from conjugate_prior import *``
+_LAZY = {"FeedbackAggregator": ".aggregator", "DeltaCoordinator": ".sharding", "ShardedIngest": ".sharding"}
+__all__ = [name for name in globals() if not name.startswith("_")] + list(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(_import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,21 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    Keeps ``import conjugate_prior`` cheap for code paths that never touch SciPy or matplotlib.
+    """
+    __slots__ = ["_name", "_module"]
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return "<lazy module '{}'>".format(self._name)
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def predictive_shapes(size, batch=()):
+    """Output shape and parameter-draw shape for ``sample_predictive``.
+
+    With ``size=(n_param_draws, n_obs)`` (or more leading axes) one parameter is drawn per
+    row and shared by its ``n_obs`` observations; with an int or 1-tuple every observation
+    gets its own parameter draw. ``batch`` is appended to both shapes.
+    """
+    size = (int(size),) if np.ndim(size) == 0 else tuple(size)
+    param = size[:-1] + (1,) if len(size) > 1 else size
+    return size + tuple(batch), param + tuple(batch)
+
+
+def float_buffer(out, shape):
+    if out is None:
+        return np.empty(shape)
+    if out.shape != shape or out.dtype != np.float64:
+        raise ValueError("out must be a float64 array of shape {}".format(shape))
+    return out
+
+
+def fill(out, values):
+    if out is None:
+        return values
+    if out.shape != values.shape:
+        raise ValueError("out must be an array of shape {}".format(values.shape))
+    out[...] = values
+    return out
+
+
+def categorical(rng, weights, n_obs):
+    """``n_obs`` category indices per row of unnormalized ``weights`` (R, k), shape (R, n_obs).
+
+    Every row is shifted by its row number so a single ``searchsorted`` over the flattened
+    cumulative weights serves all rows.
+    """
+    rows, k = weights.shape
+    cum = np.cumsum(weights, axis=1)
+    cum /= cum[:, -1:]
+    offsets = np.arange(rows, dtype=float)[:, np.newaxis]
+    cum += offsets
+    u = rng.random((rows, n_obs))
+    u += offsets
+    idx = np.searchsorted(cum.ravel(), u.ravel(), side="right").reshape(rows, n_obs)
+    idx -= np.arange(rows)[:, np.newaxis] * k
+    return np.minimum(idx, k - 1, out=idx)
@@ -0,0 +1,187 @@
+import asyncio
+import math
+import time
+from .prior import GammaExponentialRanker
+
+
+class FeedbackAggregator:
+    """Asyncio front that batches feedback events before they reach a ranker.
+
+    Events are merged per arm into sufficient statistics -- ``(positives, negatives)`` for a
+    ``BetaBinomialRanker``, ``(count, total duration)`` for a ``GammaExponentialRanker`` -- and
+    applied with one ``ingest`` call when ``max_events`` are buffered or ``max_delay`` seconds
+    after the first buffered event. ``put`` waits while ``max_queue`` events are queued
+    (backpressure). The ranker may also be a ``ConcurrentRanker``.
+
+    Events are validated by ``put``. A flush the ranker rejects drops that batch (counted in
+    ``metrics``) without stopping the aggregator, and its error is re-raised by ``close``; if
+    the background task itself dies, ``put`` raises instead of waiting forever.
+
+        async with FeedbackAggregator(ranker, max_delay=0.5) as agg:
+            await agg.put("cmpgn1", 1, 0)   # BetaBinomialRanker: (name, p, n)
+            await agg.put("cmpgn2", 3.2)    # GammaExponentialRanker: (name, duration)
+    """
+    def __init__(self, ranker, max_events=10000, max_delay=1.0, max_queue=100000):
+        self.ranker = ranker
+        self.max_events = max_events
+        self.max_delay = max_delay
+        self._durations = isinstance(getattr(ranker, "ranker", ranker), GammaExponentialRanker)
+        self._queue = asyncio.Queue(max_queue)
+        self._buffer = {}
+        self._buffered = 0
+        self._deadline = None
+        self._task = None
+        self.events_received = 0
+        self.events_flushed = 0
+        self.events_dropped = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_error = None
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def close(self):
+        """Apply everything queued so far and stop the background task.
+
+        Re-raises the error of the last failed flush, if any.
+        """
+        if self._task is not None:
+            task, self._task = self._task, None
+            if not task.done():
+                await self._queue.put(None)
+            await task
+        self.flush()
+        if self.last_error is not None:
+            error, self.last_error = self.last_error, None
+            raise error
+
+    def _event(self, name, stats):
+        if not isinstance(name, str):
+            raise TypeError("FeedbackAggregator needs arm names, not {}".format(type(name).__name__))
+        if self._durations and len(stats) == 1:
+            stats = (1, stats[0])
+        if len(stats) != 2:
+            raise SyntaxError("Illegal number of arguments")
+        count, total = float(stats[0]), float(stats[1])
+        if not (math.isfinite(count) and math.isfinite(total) and count >= 0 and total >= 0):
+            raise ValueError("Event statistics must be finite and non-negative")
+        return name, count, total
+
+    def _check_running(self):
+        if self._task is not None and self._task.done():
+            # exception() raises CancelledError itself for a cancelled task
+            raise RuntimeError("The aggregator's background task has stopped") from self._task.exception()
+
+    async def put(self, name, *stats):
+        event = self._event(name, stats)
+        self._check_running()
+        if self._queue.full() and self._task is not None:
+            # wait for room, but give up if the task that frees it dies meanwhile
+            waiter = asyncio.ensure_future(self._queue.put(event))
+            await asyncio.wait([waiter, self._task], return_when=asyncio.FIRST_COMPLETED)
+            if not waiter.done():
+                waiter.cancel()
+                self._check_running()
+            await waiter
+        else:
+            await self._queue.put(event)
+        self.events_received += 1
+
+    def put_nowait(self, name, *stats):
+        """Like ``put`` but raises ``asyncio.QueueFull`` instead of waiting."""
+        event = self._event(name, stats)
+        self._check_running()
+        self._queue.put_nowait(event)
+        self.events_received += 1
+
+    def _add(self, name, count, total):
+        acc = self._buffer.get(name)
+        if acc is None:
+            self._buffer[name] = [count, total]
+        else:
+            acc[0] += count
+            acc[1] += total
+        self._buffered += 1
+        if self._deadline is None:
+            self._deadline = time.monotonic() + self.max_delay
+
+    def flush(self):
+        """Apply the buffered statistics to the ranker now."""
+        if not self._buffer:
+            return
+        start = time.perf_counter()
+        names = list(self._buffer)
+        first, second = zip(*self._buffer.values())
+        if self._durations:
+            self.ranker.ingest(names, second, counts=first)
+        else:
+            self.ranker.ingest(names, first, second)
+        elapsed = time.perf_counter() - start
+        self.events_flushed += self._buffered
+        self.flushes += 1
+        self.flush_seconds += elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self._buffer = {}
+        self._buffered = 0
+        self._deadline = None
+
+    def _try_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # drop the batch rather than retrying it forever; close() re-raises the error
+            self.flush_errors += 1
+            self.events_dropped += self._buffered
+            self.last_error = e
+            self._buffer = {}
+            self._buffered = 0
+            self._deadline = None
+
+    async def _run(self):
+        while True:
+            timeout = None if self._deadline is None else max(0.0, self._deadline - time.monotonic())
+            try:
+                event = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                self._try_flush()
+                continue
+            # drain whatever else is already queued before deciding to flush
+            while event is not None:
+                self._add(*event)
+                if self._buffered >= self.max_events:
+                    self._try_flush()
+                try:
+                    event = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+            if event is None:
+                return
+            if self._deadline is not None and time.monotonic() >= self._deadline:
+                self._try_flush()
+
+    def metrics(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "buffered_events": self._buffered,
+            "buffered_arms": len(self._buffer),
+            "events_received": self.events_received,
+            "events_flushed": self.events_flushed,
+            "events_dropped": self.events_dropped,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "flush_seconds_total": self.flush_seconds,
+            "flush_seconds_max": self.max_flush_seconds,
+            "flush_seconds_mean": self.flush_seconds / self.flushes if self.flushes else 0.0,
+        }
@@ -1,18 +1,155 @@
+import functools
 import numpy as np
-from scipy import stats
-from scipy import special as fn
+from .suffstats import iter_chunks
+from ._sampling import predictive_shapes
+from ._lazy import LazyModule
+stats = LazyModule("scipy.stats")
+fn = LazyModule("scipy.special")
+# raises ModuleNotFoundError on first use when matplotlib is missing
+plt = LazyModule("matplotlib.pyplot")
 
-try:
-    from matplotlib import pyplot as plt
-except ModuleNotFoundError:
-    import sys
 
-    sys.stderr.write("matplotlib was not found, plotting would raise an exception.\n")
-    plt = None
+def betabinom_logpmf(t, f, a, b, log_norm=None):
+    """Log posterior-predictive pmf of ``t`` successes and ``f`` failures under Beta(a, b).
+
+    All arguments broadcast; ``log_norm`` is ``betaln(a, b)`` and may be passed in when it is
+    reused across calls.
+    """
+    if log_norm is None:
+        log_norm = fn.betaln(a, b)
+    return fn.betaln(t + a, f + b) - log_norm - np.log1p(t + f) - fn.betaln(t + 1, f + 1)
+
+
+# (a, b) range covered by the "table" quantile engine
+_TABLE_RANGE = (1.0, 1e6)
+_TABLE_SIZE = 257
+
+
+def _beta_ppf_normal(p, a, b):
+    # Paulson's cube-root (Wilson-Hilferty) approximation of the F quantile, X = aF / (aF + b)
+    z = fn.ndtri(p)
+    d1, d2 = 1.0 / (9 * a), 1.0 / (9 * b)
+    root = np.sqrt(np.maximum((1 - d1) ** 2 * d2 + (1 - d2) ** 2 * d1 - z * z * d1 * d2, 0))
+    f = (((1 - d1) * (1 - d2) + z * root) / ((1 - d2) ** 2 - z * z * d2)) ** 3
+    return a * f / (a * f + b)
+
+
+@functools.lru_cache(maxsize=16)
+def _beta_ppf_table(p):
+    grid = np.linspace(np.log(_TABLE_RANGE[0]), np.log(_TABLE_RANGE[1]), _TABLE_SIZE)
+    a, b = np.meshgrid(np.exp(grid), np.exp(grid), indexing="ij")
+    return grid, fn.logit(stats.beta.ppf(p, a, b))
+
+
+def _beta_ppf_interpolated(p, a, b):
+    grid, table = _beta_ppf_table(p)
+    step = grid[1] - grid[0]
+    x = (np.log(a) - grid[0]) / step
+    y = (np.log(b) - grid[0]) / step
+    i = np.clip(x.astype(int), 0, len(grid) - 2)
+    j = np.clip(y.astype(int), 0, len(grid) - 2)
+    fx, fy = x - i, y - j
+    logit = (table[i, j] * (1 - fx) * (1 - fy) + table[i + 1, j] * fx * (1 - fy) +
+             table[i, j + 1] * (1 - fx) * fy + table[i + 1, j + 1] * fx * fy)
+    return fn.expit(logit)
+
+
+def beta_ppf(p, a, b, method="exact"):
+    """Quantile ``p`` of Beta(a, b), vectorized over ``a`` and ``b``.
+
+    method:
+      "exact"  - ``scipy.stats.beta.ppf`` (iterative inversion).
+      "normal" - Paulson's cube-root normal approximation; for 0.5 <= p <= 0.99 the absolute
+                 error is below 1.5e-2 when a, b >= 1, 2e-3 when a, b >= 5 and 1e-4 when
+                 a, b >= 30. Tens of times faster than "exact".
+      "table"  - bilinear interpolation of logit(ppf) on a 257x257 grid over log a, log b in
+                 [1, 1e6], built once per p (~0.15s); absolute error below 1e-4 inside the grid.
+                 Arms below the grid use "exact", arms above it use "normal".
+    """
+    if method == "exact":
+        return stats.beta.ppf(p, a, b)
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    if method == "normal":
+        return _beta_ppf_normal(p, a, b)
+    elif method != "table":
+        raise ValueError("method must be one of 'exact', 'normal' or 'table'")
+    lo, hi = _TABLE_RANGE
+    small = (a < lo) | (b < lo)
+    large = ~small & ((a > hi) | (b > hi))
+    inside = ~(small | large)
+    ret = np.empty(a.shape)
+    ret[inside] = _beta_ppf_interpolated(p, a[inside], b[inside])
+    ret[small] = stats.beta.ppf(p, a[small], b[small])
+    ret[large] = _beta_ppf_normal(p, a[large], b[large])
+    return ret[()]
+
+
+def beta_prob_greater(a1, b1, a2, b2):
+    """P(X1 > X2) for independent X1 ~ Beta(a1, b1) and X2 ~ Beta(a2, b2), broadcast over arguments.
+
+    Exact sum of ``a1`` terms (Miller's formula), so ``a1`` must hold integers. The terms follow
+    a simple ratio recurrence and are accumulated in log space; the cost is ``sum(a1)``
+    multiply-adds, so pass the side with the smaller ``a``.
+    """
+    a1, b1, a2, b2 = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a1, b1, a2, b2)))
+    shape = a1.shape
+    order = np.argsort(-a1, axis=None)
+    a1, b1, a2, b2 = (v.ravel()[order] for v in (a1, b1, a2, b2))
+    terms = np.rint(a1).astype(np.int64)
+    log_term = fn.betaln(a2, b2 + b1) - fn.betaln(a2, b2)
+    total = np.exp(log_term)
+    # arms are sorted by decreasing a1, so the pairs still summing are a prefix
+    active = np.searchsorted(-terms, -np.arange(1, terms[0] if terms.size else 0), side="left")
+    for t, m in enumerate(active):
+        log_term[:m] += np.log((a2[:m] + t) * (b1[:m] + t) / ((a2[:m] + b2[:m] + b1[:m] + t) * (t + 1)))
+        total[:m] += np.exp(log_term[:m])
+    ret = np.empty(total.size)
+    ret[order] = np.clip(total, 0.0, 1.0)
+    return ret.reshape(shape)[()]
+
+
+def _bernoulli_predictive(a, b, size, rng, out, batch=()):
+    shape, param = predictive_shapes(size, batch)
+    rng = np.random.default_rng(rng)
+    if out is not None and out.shape != shape:
+        raise ValueError("out must be an array of shape {}".format(shape))
+    p = rng.beta(a, b, param)
+    u = rng.random(out=out) if out is not None and out.dtype == np.float64 else rng.random(shape)
+    return np.less(u, p, out=out, casting="unsafe")
+
+
+def count_outcomes(data):
+    """Return ``(successes, failures)`` in ``data``: any truthy value is a success.
+
+    ``data`` may be an array, a list, a bytes-like object (one outcome per byte) or an iterable
+    of such chunks and/or scalars; chunks are counted with ``np.count_nonzero``.
+    """
+    p = n = 0
+    for chunk in iter_chunks(data):
+        k = int(np.count_nonzero(chunk))
+        p += k
+        n += chunk.size - k
+    return p, n
+
+
+def count_bits(bitset, n_bits=None):
+    """Return ``(successes, failures)`` in a packed bitset (as produced by ``np.packbits``)
+    holding ``n_bits`` outcomes (default: all bits of the buffer)."""
+    bitset = np.frombuffer(bitset, dtype=np.uint8) if not isinstance(bitset, np.ndarray) else bitset
+    if n_bits is None:
+        n_bits = bitset.size * 8
+    full, rest = divmod(n_bits, 8)
+    if hasattr(np, "bitwise_count"):
+        p = int(np.bitwise_count(bitset[:full]).sum())
+    else:
+        p = int(np.unpackbits(bitset[:full]).sum())
+    if rest:
+        p += int(np.unpackbits(bitset[full:full + 1])[:rest].sum())
+    return p, n_bits - p
 
 
 class BetaBinomial:
-    __slots__ = ["positives", "negatives"]
+    __slots__ = ["positives", "negatives", "_log_norm"]
 
     def __init__(self, *args):
         if not any(args) or args[0] is None:
@@ -27,6 +164,7 @@ class BetaBinomial:
             self.negatives = args[1]
         else:
             raise SyntaxError("Illegal number of arguments")
+        self._log_norm = None
 
     def __iadd__(self, other):
         if isinstance(other, BetaBinomial):
@@ -40,12 +178,7 @@ class BetaBinomial:
         return self
     def update(self, *args):
         if len(args) == 1:
-            n = p = 0
-            for x in args[0]:
-                if x:
-                    p += 1
-                else:
-                    n += 1
+            p, n = count_outcomes(args[0])
             return BetaBinomial(self.positives + p, self.negatives + n)
         elif len(args) == 2:
             return BetaBinomial(self.positives + args[0], self.negatives + args[1])
@@ -76,8 +209,12 @@ class BetaBinomial:
     def predict(self, t, f, log=False):
         a = self.positives
         b = self.negatives
-        log_pmf = (fn.gammaln(t + f + 1) + fn.gammaln(t + a) + fn.gammaln(f + b) + fn.gammaln(a + b)) - \
-                  (fn.gammaln(t + 1) + fn.gammaln(f + 1) + fn.gammaln(a) + fn.gammaln(b) + fn.gammaln(t + f + a + b))
+        # betaln(a, b) is cached until the parameters change
+        # getattr: models pickled before the cache existed do not have the slot set
+        cached = getattr(self, "_log_norm", None)
+        if cached is None or cached[:2] != (a, b):
+            self._log_norm = (a, b, fn.betaln(a, b))
+        log_pmf = betabinom_logpmf(t, f, a, b, self._log_norm[2])
         if log:
             return log_pmf
         return np.exp(log_pmf)
@@ -85,20 +222,24 @@ class BetaBinomial:
     def sample(self, n=1):
         p = np.random.beta(self.positives, self.negatives,n)
         return p
-    
-    def percentile(self, p):
-        return stats.beta.ppf(p, self.positives, self.negatives)
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive Bernoulli outcomes of shape ``size``, boolean unless ``out`` is given.
+
+        With ``size=(n_param_draws, n_obs)`` each row shares one success probability drawn from
+        the posterior. ``out`` is any preallocated numeric array of that shape; a float64 one is
+        also used as the buffer for the uniform draws, so no temporary is allocated.
+        """
+        return _bernoulli_predictive(self.positives, self.negatives, size, rng, out)
+
+    def percentile(self, p, method="exact"):
+        return beta_ppf(p, self.positives, self.negatives, method)
 
 
 class BetaBernoulli(BetaBinomial):
     def update(self, *args):
         if len(args) == 1:
-            n = p = 0
-            for x in args[0]:
-                if x:
-                    p += 1
-                else:
-                    n += 1
+            p, n = count_outcomes(args[0])
             return BetaBernoulli(self.positives + p, self.negatives + n)
         elif len(args) == 2:
             return BetaBernoulli(self.positives + args[0], self.negatives + args[1])
@@ -109,4 +250,71 @@ class BetaBernoulli(BetaBinomial):
         p = np.random.beta(self.positives, self.negatives,n)
         if output_parameter:
             return p
-        return int(np.random.random() < p)
+        outcomes = (np.random.random(n) < p).astype(int)
+        return int(outcomes[0]) if n == 1 else outcomes
+
+
+class BetaBinomialBatch:
+    """N independent ``BetaBinomial`` models held as parameter arrays of shape (N,).
+
+    Every method broadcasts its arguments against the parameter arrays, e.g. ``x`` of
+    shape (N,) evaluates one point per model and ``x[:, None]`` every point for every model.
+    """
+    __slots__ = ["positives", "negatives"]
+
+    def __init__(self, positives, negatives):
+        self.positives, self.negatives = np.broadcast_arrays(np.asarray(positives, dtype=float),
+                                                             np.asarray(negatives, dtype=float))
+
+    @classmethod
+    def from_models(cls, models):
+        return cls([m.positives for m in models], [m.negatives for m in models])
+
+    def __len__(self):
+        return len(self.positives)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice) or np.ndim(i) > 0:
+            return type(self)(self.positives[i], self.negatives[i])
+        model = BetaBinomial()
+        model.positives, model.negatives = float(self.positives[i]), float(self.negatives[i])
+        return model
+
+    def update(self, *args):
+        if len(args) == 1:
+            # one row of observed outcomes per model
+            data = np.asarray(args[0])
+            p = np.count_nonzero(data, axis=-1)
+            return type(self)(self.positives + p, self.negatives + data.shape[-1] - p)
+        elif len(args) == 2:
+            return type(self)(self.positives + np.asarray(args[0]), self.negatives + np.asarray(args[1]))
+        else:
+            raise SyntaxError("Illegal number of arguments")
+
+    def pdf(self, x):
+        return stats.beta.pdf(x, self.positives, self.negatives)
+
+    def cdf(self, x):
+        return stats.beta.cdf(x, self.positives, self.negatives)
+
+    def posterior(self, l, u):
+        return np.where(np.asarray(l) > np.asarray(u), 0.0, self.cdf(u) - self.cdf(l))
+
+    def mean(self, n=1):
+        return self.positives * n / (self.positives + self.negatives)
+
+    def predict(self, t, f, log=False):
+        log_pmf = betabinom_logpmf(t, f, self.positives, self.negatives)
+        if log:
+            return log_pmf
+        return np.exp(log_pmf)
+
+    def sample(self, n=1):
+        return np.random.beta(self.positives, self.negatives, (n, len(self)))
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive Bernoulli outcomes of shape ``size + (N,)``, see ``BetaBinomial.sample_predictive``."""
+        return _bernoulli_predictive(self.positives, self.negatives, size, rng, out, (len(self),))
+
+    def percentile(self, p, method="exact"):
+        return beta_ppf(p, self.positives, self.negatives, method)
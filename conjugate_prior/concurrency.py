@@ -0,0 +1,104 @@
+import threading
+import time
+
+
+class ConcurrentRanker:
+    """Thread-safe front for a ``BetaBinomialRanker`` or ``GammaExponentialRanker``.
+
+    Writes (``update``, ``ingest``, item assignment, ...) are serialized by a lock and applied
+    in place. Reads (``rank_by_ucb``, ``select``, item access, ...) run against an immutable
+    snapshot that is republished read-copy-update style, so a reader never waits for a writer
+    and never sees a half-applied write. Snapshots are at most ``max_staleness`` seconds old:
+    writers republish when the current one is too old, and readers republish when the lock is
+    free; otherwise they keep reading the previous snapshot.
+
+    Every publish copies the parameter arrays, which is O(n) (about 5ms for 1M arms), so with
+    ``max_staleness=0`` every write pays that copy. The default bounds it to 20 copies a
+    second; use 0 only for small rankers or when a thread must read its own writes at once.
+    """
+    _writes = frozenset(["update", "update_all", "ingest", "discount", "reset", "merge",
+                        "fit_prior"])
+
+    def __init__(self, ranker, max_staleness=0.05):
+        self.ranker = ranker
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._version = 0
+        self._layout_changed = False
+        self._snapshot = ranker.copy()
+        self._snapshot_version = 0
+        self._snapshot_time = time.monotonic()
+
+    def _publish(self):
+        # caller holds the lock
+        r = self.ranker
+        names_from = None if self._layout_changed or r.n != self._snapshot.n else self._snapshot
+        self._snapshot = r.copy(names_from)
+        self._snapshot_version = self._version
+        self._snapshot_time = time.monotonic()
+        self._layout_changed = False
+        return self._snapshot
+
+    def _stale(self):
+        return self._snapshot_version != self._version and \
+               time.monotonic() - self._snapshot_time >= self.max_staleness
+
+    def _committed(self):
+        # caller holds the lock
+        self._version += 1
+        if self._stale():
+            self._publish()
+
+    def _write(self, fn, *args, **kwargs):
+        with self._lock:
+            ret = fn(*args, **kwargs)
+            self._committed()
+        return self if ret is self.ranker else ret
+
+    def snapshot(self):
+        """The current read-only view of the ranker."""
+        if self._stale() and self._lock.acquire(blocking=False):
+            try:
+                return self._publish()
+            finally:
+                self._lock.release()
+        return self._snapshot
+
+    def encode_delta(self, reset=False):
+        # resetting mutates the live ranker; a plain read can use the snapshot
+        if reset:
+            return self._write(self.ranker.encode_delta, reset=True)
+        return self.snapshot().encode_delta()
+
+    def __getattr__(self, name):
+        if name in self._writes:
+            fn = getattr(self.ranker, name)
+            return lambda *args, **kwargs: self._write(fn, *args, **kwargs)
+        return getattr(self.snapshot(), name)
+
+    def __len__(self):
+        return len(self.snapshot())
+
+    def __contains__(self, name):
+        return name in self.snapshot()
+
+    def __getitem__(self, name):
+        return self.snapshot()[name]
+
+    def __setitem__(self, name, value):
+        with self._lock:
+            self.ranker[name] = value
+            self._committed()
+
+    def __delitem__(self, name):
+        with self._lock:
+            del self.ranker[name]
+            # an add and a delete can leave n unchanged, so force fresh names on the next publish
+            self._layout_changed = True
+            self._committed()
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __str__(self):
+        return str(self.snapshot())
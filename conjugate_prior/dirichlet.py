@@ -1,10 +1,43 @@
 import numpy as np
-from scipy import stats
 import collections
+from .suffstats import iter_chunks
+from ._sampling import predictive_shapes, fill, categorical
+from ._lazy import LazyModule
+stats = LazyModule("scipy.stats")
+fn = LazyModule("scipy.special")
+integrate = LazyModule("scipy.integrate")
+
+
+def _sf_exact(alpha, weights, x):
+    """P(weights . theta > x) for theta ~ Dir(alpha) by Gil-Pelaez inversion."""
+    c = weights - x
+
+    def integrand(t):
+        if t == 0:
+            return np.dot(alpha, c)
+        return np.exp(-np.sum(alpha * np.log(1 - 1j * c * t))).imag / t
+
+    value, _ = integrate.quad(integrand, 0, np.inf, limit=200)
+    return min(max(0.5 + value / np.pi, 0.0), 1.0)
+
+
+def _sf_beta(alpha, weights, x):
+    """Moment-matched Beta approximation of _sf_exact, vectorized over leading axes."""
+    lo, hi = weights.min(axis=-1), weights.max(axis=-1)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    total = alpha.sum(axis=-1)
+    m = alpha / total[..., np.newaxis]
+    z = (weights - lo[..., np.newaxis]) / span[..., np.newaxis]
+    mean = (z * m).sum(axis=-1)
+    var = ((z ** 2 * m).sum(axis=-1) - mean ** 2) / (total + 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        common = mean * (1 - mean) / var - 1
+        sf = stats.beta.sf((x - lo) / span, mean * common, (1 - mean) * common)
+    return np.where(hi > lo, sf, (lo > x).astype(float))
 
 
 class DirichletMultinomial:
-    __slots__ = ["alpha", "k"]
+    __slots__ = ["alpha", "k", "_samples"]
 
     def __init__(self, alpha=None):
         if type(alpha) == int:
@@ -15,14 +48,31 @@ class DirichletMultinomial:
             self.alpha = np.array(alpha)
         else:
             raise SyntaxError("Argument should be a vector or an int")
+        self._samples = None
 
     def update(self, counts):
-        if isinstance(counts, list):
+        """``counts`` is a {category: count} dict, or the observed categories as a list, an
+        array or an iterable of chunks (counted with ``np.bincount``); categories outside
+        ``range(k)`` are ignored."""
+        counts_vec = np.zeros(self.k)
+        if isinstance(counts, list) and np.asarray(counts).dtype.kind not in "iubf":
+            # mixed categories: only the integer ones can match
             counts = collections.Counter(counts)
-        if not isinstance(counts, dict):
+        if isinstance(counts, dict):
+            for i, c in counts.items():
+                if isinstance(i, (int, np.integer)) and 0 <= i < self.k:
+                    counts_vec[i] += c
+        elif isinstance(counts, (str, bytes)):
             raise SyntaxError("Argument should be a dict or a list")
-        counts_vec = [counts.get(i, 0) for i in range(self.k)]
-        return DirichletMultinomial(np.add(self.alpha, counts_vec))
+        else:
+            for chunk in iter_chunks(counts):
+                if chunk.dtype.kind == "f":
+                    chunk = chunk[chunk == np.floor(chunk)].astype(np.int64)
+                elif chunk.dtype.kind not in "iub":
+                    continue
+                chunk = chunk[(chunk >= 0) & (chunk < self.k)]
+                counts_vec += np.bincount(chunk, minlength=self.k)
+        return DirichletMultinomial(self.alpha + counts_vec)
 
     def pdf(self, x):
         diri = stats.dirichlet(self.alpha)
@@ -31,22 +81,282 @@ class DirichletMultinomial:
     def mean(self, n=1):
         return self.alpha * n / (self.alpha.sum())
 
-    def cdf(self, weights, x):
-        Omega = lambda row: np.dot(weights, row)
-        # Sample from Dirichlet posterior
-        samples = np.random.dirichlet(self.alpha, 100000)
-        # apply sum to sample draws
-        W_samples = np.apply_along_axis(Omega, 1, samples)
-        # Compute P(W > x)
-        return (W_samples > x).mean()
+    def cdf(self, weights, x, method="exact", n_samples=100000):
+        """P(weights . theta > x) under the Dirichlet posterior.
+
+        method:
+          "exact" - numerical Gil-Pelaez inversion of the characteristic function of
+                    sum((w_i - x) * G_i), G_i ~ Gamma(alpha_i); accurate to ~1e-8, about 1ms per x.
+          "beta"  - Beta distribution moment-matched on [min(w), max(w)]; exact when the weights
+                    take at most two distinct values (e.g. 0/1 subsets), otherwise an approximation.
+          "mc"    - Monte Carlo over a bank of ``n_samples`` draws that is cached on the model and
+                    reused across calls, so the error is ~0.5/sqrt(n_samples) and consistent.
+        """
+        weights = np.asarray(weights, dtype=float)
+        x = np.asarray(x, dtype=float)
+        if method == "exact":
+            return np.vectorize(lambda v: _sf_exact(self.alpha, weights, v), otypes=[float])(x)[()]
+        elif method == "beta":
+            return _sf_beta(self.alpha, weights, x)[()]
+        elif method == "mc":
+            if self._samples is None or len(self._samples) != n_samples:
+                self._samples = np.random.dirichlet(self.alpha, n_samples)
+            W_samples = self._samples @ weights
+            return (W_samples[:, np.newaxis] > x.ravel()).mean(axis=0).reshape(x.shape)[()]
+        else:
+            raise ValueError("method must be one of 'exact', 'beta' or 'mc'")
 
-    def posterior(self, weights, l, u):
+    def posterior(self, weights, l, u, method="exact"):
         if l > u:
             return 0.0
-        return self.cdf(weights, l) - self.cdf(weights, u)
+        return self.cdf(weights, l, method) - self.cdf(weights, u, method)
 
     def sample(self, n=1):
         return np.random.dirichlet(self.alpha, n)
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive category indices of shape ``size`` drawn with an ``np.random.Generator``.
+
+        With ``size=(n_param_draws, n_obs)`` each row shares one probability vector drawn from
+        the posterior; with an int every observation gets its own. ``out`` is a preallocated
+        integer array of shape ``size`` that is filled in place.
+        """
+        shape, param = predictive_shapes(size)
+        rng = np.random.default_rng(rng)
+        weights = rng.standard_gamma(self.alpha, param + (self.k,)).reshape(-1, self.k)
+        n_obs = shape[-1] if len(shape) > 1 else 1
+        return fill(out, categorical(rng, weights, n_obs).reshape(shape))
+
+    def select(self, batch_size=1, rng=None):
+        """Thompson-sample a category index for each of ``batch_size`` requests."""
+        rng = np.random.default_rng(rng)
+        return rng.dirichlet(self.alpha, batch_size).argmax(axis=1)
     
     def percentile(self, p):
         return stats.dirichlet.ppf(p, self.alpha)
+
+
+class SparseDirichletMultinomial:
+    """``DirichletMultinomial`` over a very large number ``k`` of categories, with
+    ``alpha = base + counts`` where only the observed categories are stored.
+
+    Counts live in growable (category, count) arrays with a dict from category to slot, so
+    ``update`` costs O(touched categories) and ``mean``/``top_k``/``sample``/``select`` cost
+    O(observed categories), never O(k). ``update`` works in place and returns the model, since
+    a copy would cost O(observed categories).
+    """
+    __slots__ = ["k", "base", "total", "_index", "_categories", "_counts", "_n"]
+
+    def __init__(self, k, base=1.0):
+        self.k = int(k)
+        self.base = float(base)
+        self.total = self.k * self.base
+        self._index = {}
+        self._categories = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0)
+        self._n = 0
+
+    @property
+    def categories(self):
+        """The observed categories, in first-seen order."""
+        return self._categories[:self._n]
+
+    @property
+    def counts(self):
+        return self._counts[:self._n]
+
+    def __len__(self):
+        return self._n
+
+    def _slots(self, categories):
+        """Slots of the distinct ``categories``, adding unseen ones."""
+        slots = np.fromiter((self._index.get(c, -1) for c in categories.tolist()), dtype=np.intp,
+                            count=len(categories))
+        new = slots < 0
+        if new.any():
+            fresh = categories[new]
+            if self._n + len(fresh) > len(self._counts):
+                capacity = max(2 * len(self._counts), self._n + len(fresh), 8)
+                self._categories = np.concatenate([self._categories[:self._n],
+                                                   np.empty(capacity - self._n, dtype=np.int64)])
+                self._counts = np.concatenate([self._counts[:self._n], np.zeros(capacity - self._n)])
+            slots[new] = np.arange(self._n, self._n + len(fresh))
+            self._categories[slots[new]] = fresh
+            self._index.update(zip(fresh.tolist(), slots[new].tolist()))
+            self._n += len(fresh)
+        return slots
+
+    def _add(self, categories, counts):
+        keep = (categories >= 0) & (categories < self.k)
+        categories, inverse = np.unique(categories[keep], return_inverse=True)
+        if len(categories):
+            counts = counts[keep]
+            # slots first: adding categories may reallocate ``_counts``
+            slots = self._slots(categories)
+            self._counts[slots] += np.bincount(inverse.ravel(), weights=counts, minlength=len(categories))
+            self.total += counts.sum()
+
+    def update(self, counts):
+        """Same arguments as ``DirichletMultinomial.update``, applied in place."""
+        if isinstance(counts, list) and np.asarray(counts).dtype.kind not in "iubf":
+            counts = collections.Counter(counts)
+        if isinstance(counts, dict):
+            items = [(i, c) for i, c in counts.items() if isinstance(i, (int, np.integer))]
+            self._add(np.array([i for i, _ in items], dtype=np.int64), np.array([c for _, c in items], dtype=float))
+        elif isinstance(counts, (str, bytes)):
+            raise SyntaxError("Argument should be a dict or a list")
+        else:
+            for chunk in iter_chunks(counts):
+                if chunk.dtype.kind == "f":
+                    chunk = chunk[chunk == np.floor(chunk)]
+                elif chunk.dtype.kind not in "iub":
+                    continue
+                self._add(chunk.astype(np.int64), np.ones(len(chunk)))
+        return self
+
+    def copy(self):
+        ret = SparseDirichletMultinomial(self.k, self.base)
+        ret.total = self.total
+        ret._index = dict(self._index)
+        ret._categories = self.categories.copy()
+        ret._counts = self.counts.copy()
+        ret._n = self._n
+        return ret
+
+    def alpha(self, categories):
+        """Concentration of the given categories."""
+        categories = np.asarray(categories, dtype=np.int64)
+        slots = np.fromiter((self._index.get(c, -1) for c in categories.ravel().tolist()), dtype=np.intp,
+                            count=categories.size).reshape(categories.shape)
+        return self.base + np.where(slots >= 0, self._counts[slots], 0.0)
+
+    def mean(self, categories=None, n=1):
+        """Posterior mean of the given categories; without ``categories`` the dense vector of
+        length k is built (O(k))."""
+        if categories is not None:
+            return self.alpha(categories) * n / self.total
+        ret = np.full(self.k, self.base)
+        ret[self.categories] += self.counts
+        return ret * n / self.total
+
+    def top_k(self, k):
+        """The ``k`` categories with the highest posterior mean and their means, best first;
+        unobserved categories (all tied at ``base``) fill in by increasing index."""
+        order = np.argsort(-self.counts, kind="stable")[:k]
+        order = order[self.counts[order] > 0]
+        top = self.categories[order]
+        if len(top) < k:
+            # the first k + len(top) indices hold at least k - len(top) categories not in ``top``
+            fill = np.setdiff1d(np.arange(min(self.k, k + len(top))), top)[:k - len(top)]
+            top = np.concatenate([top, fill])
+        return top, self.mean(top)
+
+    def sample(self, n=1, rng=None):
+        """``n`` posterior draws in sparse form: ``(theta, rest)`` where ``theta`` (n, len(self))
+        holds the probabilities of ``categories`` and ``rest`` (n,) the total probability of the
+        unobserved categories (which are exchangeable). Built from Gamma draws for the observed
+        categories and a single Gamma(base * unobserved) draw for the rest."""
+        rng = np.random.default_rng(rng)
+        g = rng.standard_gamma(self.base + self.counts, (n, self._n))
+        rest = rng.standard_gamma(self.base * (self.k - self._n), n) if self.k > self._n else np.zeros(n)
+        norm = g.sum(axis=1) + rest
+        return g / norm[:, np.newaxis], rest / norm
+
+    def select(self, batch_size=1, rng=None):
+        """Thompson-sample a category index for each of ``batch_size`` requests.
+
+        The largest of the m unobserved Gamma(base) components is drawn directly by inversion
+        (its cdf is F(x) ** m), and when it wins, a uniformly chosen unobserved category is returned.
+        """
+        rng = np.random.default_rng(rng)
+        ret = np.empty(batch_size, dtype=np.int64)
+        best = np.full(batch_size, -np.inf)
+        if self._n:
+            g = rng.standard_gamma(self.base + self.counts, (batch_size, self._n))
+            ret, best = self.categories[g.argmax(axis=1)], g.max(axis=1)
+        unobserved = self.k - self._n
+        if unobserved:
+            tail = -np.expm1(np.log(rng.random(batch_size)) / unobserved)
+            wins = fn.gammainccinv(self.base, tail) > best
+            ret[wins] = self._unobserved(rng, np.count_nonzero(wins))
+        return ret
+
+    def _unobserved(self, rng, size):
+        ret = rng.integers(0, self.k, size)
+        while True:
+            taken = np.fromiter((c in self._index for c in ret.tolist()), dtype=bool, count=size)
+            if not taken.any():
+                return ret
+            ret[taken] = rng.integers(0, self.k, np.count_nonzero(taken))
+
+    def to_dense(self):
+        return DirichletMultinomial(self.mean() * self.total)
+
+
+class DirichletMultinomialBatch:
+    """N independent ``DirichletMultinomial`` models held as a parameter array of shape (N, k)."""
+    __slots__ = ["alpha", "k"]
+
+    def __init__(self, alpha):
+        self.alpha = np.asarray(alpha, dtype=float)
+        if self.alpha.ndim != 2:
+            raise SyntaxError("Argument should be a matrix of shape (N, k)")
+        self.k = self.alpha.shape[1]
+
+    @classmethod
+    def from_models(cls, models):
+        return cls(np.stack([m.alpha for m in models]))
+
+    def __len__(self):
+        return len(self.alpha)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice) or np.ndim(i) > 0:
+            return type(self)(self.alpha[i])
+        return DirichletMultinomial(self.alpha[i])
+
+    def update(self, counts):
+        """``counts`` is an (N, k) matrix of per-category counts, one row per model."""
+        return type(self)(self.alpha + np.asarray(counts))
+
+    def pdf(self, x):
+        x = np.asarray(x, dtype=float)
+        log_pdf = fn.gammaln(self.alpha.sum(axis=-1)) - fn.gammaln(self.alpha).sum(axis=-1) + \
+                  ((self.alpha - 1) * np.log(x)).sum(axis=-1)
+        return np.exp(log_pdf)
+
+    def mean(self, n=1):
+        return self.alpha * n / self.alpha.sum(axis=-1, keepdims=True)
+
+    def cdf(self, weights, x, method="exact"):
+        """P(weights . theta > x) per model, see ``DirichletMultinomial.cdf`` for the methods.
+
+        As there, the default is "exact", which loops over the models (about 1ms each); pass
+        ``method="beta"`` for the vectorized moment-matched approximation on large batches.
+        """
+        weights = np.broadcast_to(np.asarray(weights, dtype=float), self.alpha.shape)
+        x = np.broadcast_to(np.asarray(x, dtype=float), (len(self),))
+        if method == "exact":
+            return np.array([_sf_exact(a, w, v) for a, w, v in zip(self.alpha, weights, x)])
+        elif method == "beta":
+            return _sf_beta(self.alpha, weights, x)
+        else:
+            raise ValueError("method must be either 'exact' or 'beta'")
+
+    def posterior(self, weights, l, u, method="exact"):
+        return np.where(np.asarray(l) > np.asarray(u), 0.0,
+                        self.cdf(weights, l, method) - self.cdf(weights, u, method))
+
+    def sample(self, n=1):
+        g = np.random.gamma(self.alpha, size=(n,) + self.alpha.shape)
+        return g / g.sum(axis=-1, keepdims=True)
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive category indices of shape ``size + (N,)``, see ``DirichletMultinomial.sample_predictive``."""
+        shape, param = predictive_shapes(size, (len(self),))
+        lead, n_obs = (shape[:-2], shape[-2]) if len(shape) > 2 else (shape[:-1], 1)
+        rng = np.random.default_rng(rng)
+        weights = rng.standard_gamma(self.alpha, param + (self.k,)).reshape(-1, self.k)
+        # rows of ``weights`` run over (draw, model), so the observations come out model-major
+        idx = categorical(rng, weights, n_obs).reshape(lead + (len(self), n_obs))
+        return fill(out, np.swapaxes(idx, -1, -2).reshape(shape))
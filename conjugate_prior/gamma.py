@@ -1,13 +1,95 @@
+import functools
 import numpy as np
-from scipy import stats
+from ._sampling import predictive_shapes, float_buffer, fill
+from ._lazy import LazyModule
+stats = LazyModule("scipy.stats")
+fn = LazyModule("scipy.special")
+# raises ModuleNotFoundError on first use when matplotlib is missing
+plt = LazyModule("matplotlib.pyplot")
 
-try:
-    from matplotlib import pyplot as plt
-except ModuleNotFoundError:
-    import sys
 
-    sys.stderr.write("matplotlib was not found, plotting would raise an exception.\n")
-    plt = None
+def nbinom_logpmf(x, alpha, beta, log_norm=None):
+    """Log posterior-predictive pmf of a count ``x`` under a Gamma(alpha, rate=beta) prior on a Poisson rate.
+
+    All arguments broadcast; ``log_norm`` is ``alpha * log(beta / (1 + beta)) - gammaln(alpha)``
+    and may be passed in when it is reused across calls.
+    """
+    if log_norm is None:
+        log_norm = alpha * (np.log(beta) - np.log1p(beta)) - fn.gammaln(alpha)
+    return fn.gammaln(x + alpha) - fn.gammaln(x + 1) - x * np.log1p(beta) + log_norm
+
+
+# shape range covered by the "table" quantile engine
+_TABLE_RANGE = (1.0, 1e6)
+_TABLE_SIZE = 1025
+
+
+def _gamma_ppf_normal(p, a):
+    # Wilson-Hilferty: (X / a) ** (1/3) is close to normal with mean 1 - 1/(9a), variance 1/(9a)
+    z = fn.ndtri(p)
+    return a * (1 - 1.0 / (9 * a) + z * np.sqrt(1.0 / (9 * a))) ** 3
+
+
+@functools.lru_cache(maxsize=16)
+def _gamma_ppf_table(p):
+    grid = np.linspace(np.log(_TABLE_RANGE[0]), np.log(_TABLE_RANGE[1]), _TABLE_SIZE)
+    a = np.exp(grid)
+    return grid, np.log(fn.gammaincinv(a, p) / a)
+
+
+def gamma_ppf(p, a, scale=1.0, method="exact"):
+    """Quantile ``p`` of Gamma(a, scale), vectorized over ``a`` and ``scale``.
+
+    method:
+      "exact"  - ``scipy.stats.gamma.ppf`` (iterative inversion).
+      "normal" - Wilson-Hilferty approximation; for 0.5 <= p <= 0.99 the relative error is
+                 below 1.5e-2 when a >= 1, 1.5e-3 when a >= 5 and 2e-4 when a >= 30.
+      "table"  - linear interpolation of log(ppf / a) on 1025 points of log a in [1, 1e6],
+                 built once per p; inside the grid the relative error is below 1.5e-5 for
+                 0.5 <= p <= 0.999 (6e-5 at p = 0.05). Shapes below the grid use "exact", shapes
+                 above it use "normal".
+    """
+    if method == "exact":
+        return stats.gamma.ppf(p, a, scale=scale)
+    a = np.asarray(a, dtype=float)
+    if method == "normal":
+        return _gamma_ppf_normal(p, a) * scale
+    elif method != "table":
+        raise ValueError("method must be one of 'exact', 'normal' or 'table'")
+    lo, hi = _TABLE_RANGE
+    grid, table = _gamma_ppf_table(p)
+    small, large = a < lo, a > hi
+    inside = ~(small | large)
+    ret = np.empty(a.shape)
+    # the grid is uniform in log a, so index it directly rather than binary-searching (np.interp)
+    x = (np.log(a[inside]) - grid[0]) / (grid[1] - grid[0])
+    i = np.clip(x.astype(int), 0, len(grid) - 2)
+    x -= i
+    ret[inside] = a[inside] * np.exp(table[i] + (table[i + 1] - table[i]) * x)
+    ret[small] = fn.gammaincinv(a[small], p)
+    ret[large] = _gamma_ppf_normal(p, a[large])
+    return ret[()] * scale
+
+
+def gamma_prob_greater(a1, b1, a2, b2):
+    """P(L1 > L2) for independent L1 ~ Gamma(a1, rate=b1) and L2 ~ Gamma(a2, rate=b2), broadcast
+    over arguments. Exact: b1 L1 / (b1 L1 + b2 L2) is Beta(a1, a2) distributed."""
+    return fn.betainc(a2, a1, b2 / (b1 + b2))
+
+
+def _exponential_predictive(alpha, beta, size, rng, out, batch=()):
+    shape, param = predictive_shapes(size, batch)
+    rng = np.random.default_rng(rng)
+    lamda = rng.gamma(alpha, 1.0 / beta, param)
+    ret = rng.standard_exponential(out=float_buffer(out, shape))
+    ret /= lamda
+    return ret
+
+
+def _poisson_predictive(alpha, beta, size, rng, out, batch=()):
+    shape, param = predictive_shapes(size, batch)
+    rng = np.random.default_rng(rng)
+    return fill(out, rng.poisson(rng.gamma(alpha, 1.0 / beta, param), shape))
 
 
 class GammaExponential:
@@ -73,12 +155,27 @@ class GammaExponential:
     def sample(self,n=1):
         lamda = np.random.gamma(self.alpha, 1/self.beta)
         return np.random.exponential(1/lamda,n)
-    
-    def percentile(self, p):
-        return stats.gamma.ppf(p, self.alpha, scale=1.0 / self.beta)
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive observations of shape ``size`` drawn with an ``np.random.Generator``.
+
+        With ``size=(n_param_draws, n_obs)`` each row shares one rate drawn from the posterior;
+        with an int every observation gets its own. ``out`` is a preallocated array of shape
+        ``size`` that is filled in place (float64 here, any numeric dtype for counts).
+        """
+        return _exponential_predictive(self.alpha, self.beta, size, rng, out)
+
+    def percentile(self, p, method="exact"):
+        return gamma_ppf(p, self.alpha, 1.0 / self.beta, method)
 
 
 class GammaPoisson(GammaExponential):
+    __slots__ = ["_log_norm"]
+
+    def __init__(self, alpha, beta=None):
+        super().__init__(alpha, beta)
+        self._log_norm = None
+
     def update(self, *args):
         if len(args) == 1:
             return GammaPoisson(self.alpha + sum(args[0]), self.beta + len(args[0]))
@@ -87,9 +184,109 @@ class GammaPoisson(GammaExponential):
         else:
             raise SyntaxError("Illegal number of arguments")
 
-    def predict(self, x):
-        return stats.nbinom.pmf(x, self.alpha, scale=1.0 / (1 + self.beta))
+    def predict(self, x, log=False):
+        a = self.alpha
+        b = self.beta
+        # the x-independent terms are cached until the parameters change
+        # getattr: models pickled before the cache existed do not have the slot set
+        cached = getattr(self, "_log_norm", None)
+        if cached is None or cached[:2] != (a, b):
+            self._log_norm = (a, b, a * (np.log(b) - np.log1p(b)) - fn.gammaln(a))
+        log_pmf = nbinom_logpmf(x, a, b, self._log_norm[2])
+        if log:
+            return log_pmf
+        return np.exp(log_pmf)
 
     def sample(self,n=1):
         lamda = np.random.gamma(self.alpha, 1/self.beta)
         return np.random.poisson(lamda,n)
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        return _poisson_predictive(self.alpha, self.beta, size, rng, out)
+
+
+class GammaExponentialBatch:
+    """N independent ``GammaExponential`` models held as parameter arrays of shape (N,).
+
+    Every method broadcasts its arguments against the parameter arrays, e.g. ``x`` of
+    shape (N,) evaluates one point per model and ``x[:, None]`` every point for every model.
+    """
+    __slots__ = ["alpha", "beta"]
+    _model = GammaExponential
+
+    def __init__(self, alpha, beta):
+        self.alpha, self.beta = np.broadcast_arrays(np.asarray(alpha, dtype=float), np.asarray(beta, dtype=float))
+
+    @classmethod
+    def from_models(cls, models):
+        return cls([m.alpha for m in models], [m.beta for m in models])
+
+    def __len__(self):
+        return len(self.alpha)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice) or np.ndim(i) > 0:
+            return type(self)(self.alpha[i], self.beta[i])
+        return self._model(float(self.alpha[i]), float(self.beta[i]))
+
+    def update(self, *args):
+        if len(args) == 1:
+            # one row of observations per model
+            data = np.asarray(args[0], dtype=float)
+            return type(self)(self.alpha + data.shape[-1], self.beta + data.sum(axis=-1))
+        elif len(args) == 2:
+            return type(self)(self.alpha + np.asarray(args[0]), self.beta + np.asarray(args[1]))
+        else:
+            raise SyntaxError("Illegal number of arguments")
+
+    def pdf(self, x):
+        return stats.gamma.pdf(1.0 / np.asarray(x), self.alpha, scale=1.0 / self.beta)
+
+    def cdf(self, x):
+        return 1 - stats.gamma.cdf(1.0 / np.asarray(x), self.alpha, scale=1.0 / self.beta)
+
+    def posterior(self, l, u):
+        return np.where(np.asarray(l) > np.asarray(u), 0.0, self.cdf(u) - self.cdf(l))
+
+    def mean(self):
+        return self.alpha / self.beta
+
+    def predict(self, x):
+        return stats.lomax.cdf(1.0 / np.asarray(x), self.alpha, scale=1.0 / self.beta)
+
+    def sample(self, n=1):
+        lamda = np.random.gamma(self.alpha, 1 / self.beta)
+        return np.random.exponential(1 / lamda, (n, len(self)))
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive observations of shape ``size + (N,)``, see ``GammaExponential.sample_predictive``."""
+        return _exponential_predictive(self.alpha, self.beta, size, rng, out, (len(self),))
+
+    def percentile(self, p, method="exact"):
+        return gamma_ppf(p, self.alpha, 1.0 / self.beta, method)
+
+
+class GammaPoissonBatch(GammaExponentialBatch):
+    _model = GammaPoisson
+
+    def update(self, *args):
+        if len(args) == 1:
+            data = np.asarray(args[0], dtype=float)
+            return type(self)(self.alpha + data.sum(axis=-1), self.beta + data.shape[-1])
+        elif len(args) == 2:
+            return type(self)(self.alpha + np.asarray(args[0]), self.beta + np.asarray(args[1]))
+        else:
+            raise SyntaxError("Illegal number of arguments")
+
+    def predict(self, x, log=False):
+        log_pmf = nbinom_logpmf(x, self.alpha, self.beta)
+        if log:
+            return log_pmf
+        return np.exp(log_pmf)
+
+    def sample(self, n=1):
+        lamda = np.random.gamma(self.alpha, 1 / self.beta)
+        return np.random.poisson(lamda, (n, len(self)))
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        return _poisson_predictive(self.alpha, self.beta, size, rng, out, (len(self),))
@@ -0,0 +1,156 @@
+import bisect
+import functools
+import threading
+import time
+import numpy as np
+from . import beta, dirichlet, gamma, invgamma, normal, prior
+
+
+def _first(args, kwargs, *names):
+    if args:
+        return args[0]
+    return next((kwargs[name] for name in names if name in kwargs), None)
+
+
+def _items(self, args, kwargs):
+    value = _first(args, kwargs, "data", "x", "keys", "counts", "X")
+    return 1 if value is None else int(np.size(value))
+
+
+def _arms(self, args, kwargs):
+    return self.n
+
+
+def _draws(self, args, kwargs):
+    value = _first(args, kwargs, "n", "size", "batch_size")
+    return 1 if value is None else int(np.prod(value))
+
+
+# method name -> how many items (observations, arms, draws) a call handles
+_RANKER_METHODS = {"update": lambda self, args, kwargs: 1, "update_all": _arms, "ingest": _items,
+                   "merge": _arms, "rank_by_mle": _arms, "rank_by_ucb": _arms, "rank_by_thompson": _arms,
+                   "select": _draws, "mean": _arms, "percentile": _arms, "prob_best": _arms,
+                   "pairwise_win_matrix": _arms, "fit_prior": _arms}
+_MODEL_METHODS = {"update": _items, "pdf": _items, "cdf": _items, "posterior": _items, "predict": _items,
+                  "percentile": _items, "mean": _items, "sample": _draws, "sample_predictive": _draws,
+                  "select": _draws, "fit": _items}
+
+
+def _targets():
+    rankers = (prior.BetaBinomialRanker, prior.GammaExponentialRanker)
+    yield from ((cls, _RANKER_METHODS) for cls in rankers)
+    yield prior.ConjugatePrior, _MODEL_METHODS
+    for module in (beta, gamma, normal, invgamma, dirichlet):
+        for cls in vars(module).values():
+            if isinstance(cls, type) and cls.__module__ == module.__name__:
+                yield cls, _MODEL_METHODS
+
+
+class MetricsRecorder:
+    """Default instrumentation sink: call counts, latency and batch-size histograms per method.
+
+    Any callable ``sink(method, seconds, items)`` can be used instead, e.g. to forward to an
+    existing metrics client.
+    """
+    latency_buckets = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+    size_buckets = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+
+    def __call__(self, method, seconds, items):
+        with self._lock:
+            m = self._methods.get(method)
+            if m is None:
+                m = self._methods[method] = {"calls": 0, "seconds": 0.0, "items": 0, "max_items": 0,
+                                             "latency": [0] * (len(self.latency_buckets) + 1),
+                                             "sizes": [0] * (len(self.size_buckets) + 1)}
+            m["calls"] += 1
+            m["seconds"] += seconds
+            m["items"] += items
+            m["max_items"] = max(m["max_items"], items)
+            m["latency"][bisect.bisect_left(self.latency_buckets, seconds)] += 1
+            m["sizes"][bisect.bisect_left(self.size_buckets, items)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._methods = {}
+
+    def stats(self):
+        """{method: {"calls", "seconds", "items", "max_items", "latency", "sizes"}}, where the
+        histograms count calls per bucket (upper bounds ``latency_buckets``/``size_buckets``,
+        plus one overflow bucket)."""
+        with self._lock:
+            return {name: dict(m, latency=list(m["latency"]), sizes=list(m["sizes"]))
+                    for name, m in self._methods.items()}
+
+    def prometheus_text(self, prefix="conjugate_prior"):
+        """The statistics in the Prometheus text exposition format (cumulative histograms)."""
+        stats = self.stats()
+        lines = []
+        for metric, key, total, bounds in (("call_seconds", "latency", "seconds", self.latency_buckets),
+                                           ("call_items", "sizes", "items", self.size_buckets)):
+            lines.append("# TYPE {}_{} histogram".format(prefix, metric))
+            for name, m in sorted(stats.items()):
+                cumulative = np.cumsum(m[key])
+                for bound, count in zip([repr(float(b)) for b in bounds] + ["+Inf"], cumulative):
+                    lines.append('{}_{}_bucket{{method="{}",le="{}"}} {}'.format(prefix, metric, name, bound, count))
+                lines.append('{}_{}_sum{{method="{}"}} {}'.format(prefix, metric, name, m[total]))
+                lines.append('{}_{}_count{{method="{}"}} {}'.format(prefix, metric, name, m["calls"]))
+        return "\n".join(lines) + "\n"
+
+
+# (owner class, method name) -> original function, while instrumentation is enabled
+_originals = {}
+_sink = None
+
+
+def _wrap(fn, method, items):
+    names = {}
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            sink = _sink
+            if sink is not None:
+                cls = type(self)
+                name = names.get(cls) or names.setdefault(cls, "{}.{}".format(cls.__name__, method))
+                sink(name, seconds, items(self, args, kwargs))
+    return wrapper
+
+
+def enable_instrumentation(sink=None):
+    """Start recording every model and ranker hot-path call into ``sink`` (default: a new
+    ``MetricsRecorder``) and return the sink.
+
+    The methods are wrapped in place while enabled and restored by ``disable_instrumentation``,
+    so a disabled build runs the original functions with no overhead at all.
+    """
+    global _sink
+    _sink = MetricsRecorder() if sink is None else sink
+    for cls, methods in _targets():
+        for method, items in methods.items():
+            owner = next((k for k in cls.__mro__ if method in vars(k)), None)
+            if owner is None or owner is object or (owner, method) in _originals:
+                continue
+            fn = vars(owner)[method]
+            if not callable(fn) or isinstance(fn, (staticmethod, classmethod)):
+                continue
+            _originals[owner, method] = fn
+            setattr(owner, method, _wrap(fn, method, items))
+    return _sink
+
+
+def disable_instrumentation():
+    """Restore the original methods; returns the sink that was in use."""
+    global _sink
+    for (owner, method), fn in _originals.items():
+        setattr(owner, method, fn)
+    _originals.clear()
+    sink, _sink = _sink, None
+    return sink
@@ -1,13 +1,18 @@
 import numpy as np
-from scipy import stats
+from .suffstats import SufficientStats
+from ._sampling import predictive_shapes, float_buffer
+from ._lazy import LazyModule
+stats = LazyModule("scipy.stats")
+# raises ModuleNotFoundError on first use when matplotlib is missing
+plt = LazyModule("matplotlib.pyplot")
 
-try:
-    from matplotlib import pyplot as plt
-except ModuleNotFoundError:
-    import sys
 
-    sys.stderr.write("matplotlib was not found, plotting would raise an exception.\n")
-    plt = None
+def _normal_scale_predictive(alpha, beta, size, rng, out, batch=()):
+    shape, param = predictive_shapes(size, batch)
+    rng = np.random.default_rng(rng)
+    ret = rng.standard_normal(out=float_buffer(out, shape))
+    ret *= np.sqrt(beta / rng.standard_gamma(alpha, param))
+    return ret
 
 
 class InvGammaNormalKnownMean:
@@ -29,11 +34,11 @@ class InvGammaNormalKnownMean:
             raise SyntaxError("Illegal number of arguments")
 
     def update(self, data):
-        var = np.var(data)
-        mean = np.mean(data)
-        n = len(data)
-        beta_update = sum([(d - mean) ** 2 for d in data]) / 2.0
-        return InvGammaNormalKnownMean(self.alpha + n / 2.0, self.beta + beta_update)
+        if not isinstance(data, SufficientStats):
+            data = SufficientStats().add(data)
+        elif data.log:
+            raise ValueError("Expected statistics of the raw data, build them without log=True")
+        return InvGammaNormalKnownMean(self.alpha + data.count / 2.0, self.beta + data.m2 / 2.0)
 
     def pdf(self, x):
         return stats.invgamma.pdf(x, a=self.alpha, scale=self.beta)
@@ -54,9 +59,19 @@ class InvGammaNormalKnownMean:
         plt.xlim((l, u))
 
     def sample(self, n):
-        mean = stats.invgamma.rvs(a=self.alpha, scale=self.beta, size=n)
+        # InvGamma(alpha, scale=beta) draws as beta / Gamma(alpha)
+        mean = self.beta / np.random.gamma(self.alpha, size=n)
         return np.random.normal(mean, self.shape, n)
-    
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive deviations from the known mean, of shape ``size``.
+
+        With ``size=(n_param_draws, n_obs)`` each row shares one variance drawn from the
+        posterior; with an int every observation gets its own. ``out`` is a preallocated
+        float64 array of shape ``size`` that is filled in place.
+        """
+        return _normal_scale_predictive(self.alpha, self.beta, size, rng, out)
+
     def predict(self, x):
         return stats.invgamma.cdf(x, a=self.alpha, scale=self.beta)
     
@@ -67,11 +82,90 @@ class InvGammaNormalKnownMean:
 
 class InvGammaWeibullKnownShape(InvGammaNormalKnownMean):
     def update(self, data):
-        return InvGammaWeibullKnownShape(self.alpha + len(data), self.beta + sum([d ** self.shape for d in data]))
+        if isinstance(data, SufficientStats):
+            if data.log:
+                raise ValueError("Expected statistics of the raw data, build them without log=True")
+            if data.shape != self.shape:
+                raise ValueError("Statistics must be built with SufficientStats(shape=model.shape)")
+            n, power_sum = data.count, data.power_sum
+        else:
+            data = np.asarray(data, dtype=float)
+            n, power_sum = data.size, np.power(data, self.shape).sum()
+        return InvGammaWeibullKnownShape(self.alpha + n, self.beta + power_sum, self.shape)
 
     def sample(self, n):
-        l = stats.invgamma.rvs(a=self.alpha, scale=self.beta, size=n) ** (1 / self.shape)
-        return np.random.weibull(l, n)
+        # x ** shape is exponential with an InvGamma distributed scale
+        l = (self.beta / np.random.gamma(self.alpha, size=n)) ** (1 / self.shape)
+        return l * np.random.weibull(self.shape, n)
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive observations of shape ``size``, see ``InvGammaNormalKnownMean.sample_predictive``."""
+        shape, param = predictive_shapes(size)
+        rng = np.random.default_rng(rng)
+        ret = rng.standard_exponential(out=float_buffer(out, shape))
+        ret *= self.beta / rng.standard_gamma(self.alpha, param)
+        return np.power(ret, 1.0 / self.shape, out=ret)
         
     def predict(self, x):
-        raise NotImplemented("No posterior predictive")
\ No newline at end of file
+        raise NotImplemented("No posterior predictive")
+
+class InvGammaNormalKnownMeanBatch:
+    """N independent ``InvGammaNormalKnownMean`` models held as parameter arrays of shape (N,).
+
+    Every method broadcasts its arguments against the parameter arrays, e.g. ``x`` of
+    shape (N,) evaluates one point per model and ``x[:, None]`` every point for every model.
+    """
+    __slots__ = ["alpha", "beta", "shape"]
+
+    def __init__(self, alpha, beta=1, shape=1):
+        self.alpha, self.beta, self.shape = np.broadcast_arrays(np.asarray(alpha, dtype=float),
+                                                                np.asarray(beta, dtype=float),
+                                                                np.asarray(shape, dtype=float))
+
+    @classmethod
+    def from_models(cls, models):
+        return cls([m.alpha for m in models], [m.beta for m in models], [m.shape for m in models])
+
+    def __len__(self):
+        return len(self.alpha)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice) or np.ndim(i) > 0:
+            return type(self)(self.alpha[i], self.beta[i], self.shape[i])
+        return InvGammaNormalKnownMean(float(self.alpha[i]), float(self.beta[i]), float(self.shape[i]))
+
+    def update(self, *args):
+        """``update(data)`` with one row of observations per model, or ``update(count, m2)``
+        where ``m2`` is the sum of squared deviations from the sample mean."""
+        if len(args) == 1:
+            data = np.asarray(args[0], dtype=float)
+            n = data.shape[-1]
+            m2 = np.square(data - data.mean(axis=-1, keepdims=True)).sum(axis=-1)
+        elif len(args) == 2:
+            n, m2 = np.asarray(args[0]), np.asarray(args[1])
+        else:
+            raise SyntaxError("Illegal number of arguments")
+        return type(self)(self.alpha + n / 2.0, self.beta + m2 / 2.0, self.shape)
+
+    def pdf(self, x):
+        return stats.invgamma.pdf(x, a=self.alpha, scale=self.beta)
+
+    def cdf(self, x):
+        return stats.invgamma.cdf(x, a=self.alpha, scale=self.beta)
+
+    def posterior(self, l, u):
+        return np.where(np.asarray(l) > np.asarray(u), 0.0, self.cdf(u) - self.cdf(l))
+
+    def sample(self, n):
+        mean = self.beta / np.random.gamma(self.alpha, size=(n, len(self)))
+        return np.random.normal(mean, self.shape)
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive deviations of shape ``size + (N,)``, see ``InvGammaNormalKnownMean.sample_predictive``."""
+        return _normal_scale_predictive(self.alpha, self.beta, size, rng, out, (len(self),))
+
+    def predict(self, x):
+        return stats.invgamma.cdf(x, a=self.alpha, scale=self.beta)
+
+    def percentile(self, p):
+        return stats.invgamma.ppf(p, a=self.alpha, scale=self.beta)
@@ -1,13 +1,19 @@
 import numpy as np
-from scipy import stats
+from .suffstats import SufficientStats
+from ._sampling import predictive_shapes, float_buffer
+from ._lazy import LazyModule
+stats = LazyModule("scipy.stats")
+# raises ModuleNotFoundError on first use when matplotlib is missing
+plt = LazyModule("matplotlib.pyplot")
 
-try:
-    from matplotlib import pyplot as plt
-except ModuleNotFoundError:
-    import sys
 
-    sys.stderr.write("matplotlib was not found, plotting would raise an exception.\n")
-    plt = None
+def _normal_predictive(mean, var, known_var, size, rng, out, batch=()):
+    shape, param = predictive_shapes(size, batch)
+    rng = np.random.default_rng(rng)
+    ret = rng.standard_normal(out=float_buffer(out, shape))
+    ret *= np.sqrt(known_var)
+    ret += rng.normal(mean, np.sqrt(var), param)
+    return ret
 
 
 class NormalNormalKnownVar:
@@ -19,14 +25,18 @@ class NormalNormalKnownVar:
         self.known_var = known_var
 
     def update(self, data, var=None, n=None):
-        if var:
-            mean=data
+        if isinstance(data, SufficientStats):
+            if data.log:
+                raise ValueError("Expected statistics of the raw data, build them without log=True")
+            n, total = data.count, data.sum
+        elif var:
+            # data is the sample mean of n observations
+            total = data * n
         else:
-            var = np.var(data)
-            mean = np.mean(data)
-            n = len(data)
+            data = np.asarray(data, dtype=float)
+            n, total = data.size, data.sum()
         denom = (1.0 / self.var + n / self.known_var)
-        return NormalNormalKnownVar(self.known_var, (self.mean / self.var + sum(data) / self.known_var) / denom,
+        return NormalNormalKnownVar(self.known_var, (self.mean / self.var + total / self.known_var) / denom,
                                     1.0 / denom)
 
     def pdf(self, x):
@@ -52,23 +62,99 @@ class NormalNormalKnownVar:
 
     def sample(self,n=1):
         return np.random.normal(self.mean, np.sqrt(self.var + self.known_var),size=n)
-    
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive observations of shape ``size`` drawn with an ``np.random.Generator``.
+
+        With ``size=(n_param_draws, n_obs)`` each row shares one mean drawn from the posterior;
+        with an int every observation gets its own. ``out`` is a preallocated float64 array of
+        shape ``size`` that is filled in place.
+        """
+        return _normal_predictive(self.mean, self.var, self.known_var, size, rng, out)
+
     def percentile(self, p):
         return stats.norm.ppf(p, self.mean, np.sqrt(self.var))
 
 
 class NormalLogNormalKnownVar(NormalNormalKnownVar):
     def update(self, data):
-        data = np.log(data)
-        var = np.var(data)
-        mean = np.mean(data)
-        n = len(data)
+        if isinstance(data, SufficientStats):
+            if not data.log:
+                raise ValueError("Expected statistics of log(data), build them with SufficientStats(log=True)")
+            n, total = data.count, data.sum
+        else:
+            data = np.log(data)
+            n, total = data.size, data.sum()
         denom = (1.0 / self.var + n / self.known_var)
-        return NormalLogNormalKnownVar(self.known_var, (self.mean / self.var + sum(data) / self.known_var) / denom,
+        return NormalLogNormalKnownVar(self.known_var, (self.mean / self.var + total / self.known_var) / denom,
                                        1.0 / denom)
 
     def predict(self, x):
         raise NotImplemented("No posterior predictive")
 
     def sample(self,n=1):
-        return np.log(np.random.normal(self.mean, np.sqrt(self.var + self.known_var)),size=n)
+        return np.exp(np.random.normal(self.mean, np.sqrt(self.var + self.known_var), size=n))
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        ret = super().sample_predictive(size, rng, out)
+        return np.exp(ret, out=ret)
+
+
+class NormalNormalKnownVarBatch:
+    """N independent ``NormalNormalKnownVar`` models held as parameter arrays of shape (N,).
+
+    Every method broadcasts its arguments against the parameter arrays, e.g. ``x`` of
+    shape (N,) evaluates one point per model and ``x[:, None]`` every point for every model.
+    """
+    __slots__ = ["mean", "var", "known_var"]
+
+    def __init__(self, known_var, prior_mean=0, prior_var=1):
+        self.known_var, self.mean, self.var = np.broadcast_arrays(np.asarray(known_var, dtype=float),
+                                                                  np.asarray(prior_mean, dtype=float),
+                                                                  np.asarray(prior_var, dtype=float))
+
+    @classmethod
+    def from_models(cls, models):
+        return cls([m.known_var for m in models], [m.mean for m in models], [m.var for m in models])
+
+    def __len__(self):
+        return len(self.mean)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice) or np.ndim(i) > 0:
+            return type(self)(self.known_var[i], self.mean[i], self.var[i])
+        return NormalNormalKnownVar(float(self.known_var[i]), float(self.mean[i]), float(self.var[i]))
+
+    def update(self, *args):
+        """``update(data)`` with one row of observations per model, or ``update(count, total)``."""
+        if len(args) == 1:
+            data = np.asarray(args[0], dtype=float)
+            n, total = data.shape[-1], data.sum(axis=-1)
+        elif len(args) == 2:
+            n, total = np.asarray(args[0]), np.asarray(args[1])
+        else:
+            raise SyntaxError("Illegal number of arguments")
+        denom = (1.0 / self.var + n / self.known_var)
+        return type(self)(self.known_var, (self.mean / self.var + total / self.known_var) / denom, 1.0 / denom)
+
+    def pdf(self, x):
+        return stats.norm.pdf(x, self.mean, np.sqrt(self.var))
+
+    def cdf(self, x):
+        return stats.norm.cdf(x, self.mean, np.sqrt(self.var))
+
+    def posterior(self, l, u):
+        return np.where(np.asarray(l) > np.asarray(u), 0.0, self.cdf(u) - self.cdf(l))
+
+    def predict(self, x):
+        return stats.norm.cdf(x, self.mean, np.sqrt(self.var + self.known_var))
+
+    def sample(self, n=1):
+        return np.random.normal(self.mean, np.sqrt(self.var + self.known_var), size=(n, len(self)))
+
+    def sample_predictive(self, size=1, rng=None, out=None):
+        """Posterior-predictive observations of shape ``size + (N,)``, see ``NormalNormalKnownVar.sample_predictive``."""
+        return _normal_predictive(self.mean, self.var, self.known_var, size, rng, out, (len(self),))
+
+    def percentile(self, p):
+        return stats.norm.ppf(p, self.mean, np.sqrt(self.var))
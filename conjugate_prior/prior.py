@@ -1,18 +1,21 @@
 from typing import List, Tuple
+import collections
+import concurrent.futures
+import copy
+import hashlib
+import json
+import os
+import struct
+import time
 import numpy as np
-import scipy.stats as stats
-import pandas as pd
-from .gamma import GammaExponential
+from .gamma import GammaExponential, gamma_ppf, gamma_prob_greater
 from .normal import NormalNormalKnownVar
-from .beta import BetaBinomial
+from .beta import BetaBinomial, beta_ppf, beta_prob_greater
 from .invgamma import InvGammaWeibullKnownShape
-try:
-    from matplotlib import pyplot as plt
-except ModuleNotFoundError:
-    import sys
-
-    sys.stderr.write("matplotlib was not found, plotting would raise an exception.\n")
-    plt = None
+from ._lazy import LazyModule
+stats = LazyModule("scipy.stats")
+fn = LazyModule("scipy.special")
+optimize = LazyModule("scipy.optimize")
 
 def aic_bic(data, dist_name, params):
     """Calculate AIC and BIC for a given distribution"""
@@ -24,41 +27,110 @@ def aic_bic(data, dist_name, params):
     bic = np.log(n)*k - 2*log_likelihood
     return aic, bic
 
+# memoized candidate fits, keyed on (content hash, distribution, subsample size)
+_FIT_CACHE = collections.OrderedDict()
+_FIT_CACHE_SIZE = 4096
+
+def _fit_dist(dist_name, X, start=None):
+    dist = getattr(stats, dist_name)
+    if start is None:
+        return dist.fit(X)
+    # warm start: shapes are positional guesses, loc/scale keyword guesses
+    return dist.fit(X, *start[:-2], loc=start[-2], scale=start[-1])
+
+def _fit_series(kwargs, X):
+    return ConjugatePrior(**kwargs).fit(X)
+
 class ConjugatePrior:
-    def __init__(self, criterion='aic') -> None:
+    """Picks the best fitting of ``candidates`` (scipy.stats distribution names) by AIC or BIC.
+
+    Candidate fits run in a thread or process pool when ``n_jobs != 1``. ``subsample`` fits on
+    at most that many points (scores are always computed on the full data), ``warm_start``
+    seeds each fit with this instance's previous parameters, and results are memoized by a
+    hash of the data so refitting an unchanged series is free.
+    """
+    candidates = ('norm', 'expon', 'weibull_min')
+    def __init__(self, criterion='aic', candidates=None, n_jobs=1, executor='thread', subsample=None,
+                 warm_start=False, cache=True) -> None:
         self.criterion = criterion
+        if candidates is not None:
+            self.candidates = tuple(candidates)
+        self.n_jobs = n_jobs
+        self.executor = executor
+        self.subsample = subsample
+        self.warm_start = warm_start
+        self.cache = cache
         self.best_fit = None
         self.params = {}
+        self.fits = {}
+
+    def _map(self, fn, *iterables):
+        if self.n_jobs == 1:
+            return list(map(fn, *iterables))
+        if self.executor == 'process':
+            pool = concurrent.futures.ProcessPoolExecutor(self.n_jobs)
+        elif self.executor == 'thread':
+            pool = concurrent.futures.ThreadPoolExecutor(self.n_jobs)
+        else:
+            raise ValueError("Executor must be either 'thread' or 'process'")
+        with pool:
+            return list(pool.map(fn, *iterables))
+
+    def _cache_key(self, X, dist_name):
+        digest = hashlib.blake2b(X.tobytes(), digest_size=16).hexdigest()
+        return digest, dist_name, self.subsample
 
     def fit(self, X):
-        norm_params = stats.norm.fit(X)
-        exp_params = stats.expon.fit(X)
-        weibull_params = stats.weibull_min.fit(X)
+        X = np.ascontiguousarray(X, dtype=float)
+        if self.criterion.lower() not in ('aic', 'bic'):
+            raise ValueError("Criterion must be either 'aic' or 'bic'")
+        sample = X
+        if self.subsample is not None and len(X) > self.subsample:
+            # keep the extremes so that fitted supports (e.g. a Weibull loc) still cover all of X
+            sample = np.random.default_rng(0).choice(X, self.subsample, replace=False)
+            sample = np.concatenate([sample, [X.min(), X.max()]])
+        keys = {name: self._cache_key(X, name) for name in self.candidates} if self.cache else {}
+        todo = [name for name in self.candidates if keys.get(name) not in _FIT_CACHE]
+        starts = [self.fits.get(name) if self.warm_start else None for name in todo]
+        fitted = dict(zip(todo, self._map(_fit_dist, todo, [sample] * len(todo), starts)))
+        for name in self.candidates:
+            if name in fitted:
+                if self.cache:
+                    _FIT_CACHE[keys[name]] = fitted[name]
+                    if len(_FIT_CACHE) > _FIT_CACHE_SIZE:
+                        _FIT_CACHE.popitem(last=False)
+            else:
+                fitted[name] = _FIT_CACHE[keys[name]]
+                _FIT_CACHE.move_to_end(keys[name])
+        self.fits = {name: tuple(fitted[name]) for name in self.candidates}
 
         # Calculate AIC and BIC for each distribution
-        aic_norm, bic_norm = aic_bic(X, 'norm', norm_params)
-        aic_exp, bic_exp = aic_bic(X, 'expon', exp_params)
-        aic_weibull, bic_weibull = aic_bic(X, 'weibull_min', weibull_params)
-
-        # Collect results in a DataFrame for comparison
-        results = pd.DataFrame({
-            'Distribution': ['norm', 'expon', 'weibull_min'],
-            'AIC': [aic_norm, aic_exp, aic_weibull],
-            'BIC': [bic_norm, bic_exp, bic_weibull]
-        })
-
-        if self.criterion.lower() == 'aic':
-            self.best_fit = results.loc[results['AIC'].idxmin()]["Distribution"]
-        elif self.criterion.lower() == 'bic':
-            self.best_fit = results.loc[results['BIC'].idxmin()]["Distribution"]
-        else:
-            raise ValueError("Criterion must be either 'aic' or 'bic'")
-        if self.best_fit == 'norm':
-            self.params = norm_params
-        elif self.best_fit == 'expon':
-            self.params = exp_params
-        elif self.best_fit == 'weibull_min':
-            self.params = weibull_params
+        scores = np.array([aic_bic(X, name, self.fits[name]) for name in self.candidates])
+        column = 0 if self.criterion.lower() == 'aic' else 1
+        self.best_fit = self.candidates[int(np.argmin(scores[:, column]))]
+        self.params = self.fits[self.best_fit]
+        return self
+
+    @classmethod
+    def fit_many(cls, datasets, n_jobs=None, **kwargs):
+        """Fit one ``ConjugatePrior`` per dataset across a process pool; memoized series are not dispatched."""
+        models = [None] * len(datasets)
+        pending = []
+        for i, X in enumerate(datasets):
+            model = cls(**kwargs)
+            X = np.ascontiguousarray(X, dtype=float)
+            if model.cache and all(model._cache_key(X, name) in _FIT_CACHE for name in model.candidates):
+                models[i] = model.fit(X)
+            else:
+                pending.append((i, X))
+        with concurrent.futures.ProcessPoolExecutor(n_jobs) as pool:
+            fitted = pool.map(_fit_series, [kwargs] * len(pending), [X for _, X in pending])
+            for (i, X), model in zip(pending, fitted):
+                if model.cache:
+                    for name, params in model.fits.items():
+                        _FIT_CACHE[model._cache_key(X, name)] = params
+                models[i] = model
+        return models
     
     def predict(self, X):
         if self.best_fit is None:
@@ -75,103 +147,671 @@ class ConjugatePrior:
         elif self.best_fit == 'weibull_min':
             return InvGammaWeibullKnownShape(*self.params)
         
-class BetaBinomialRanker:
-    def __init__(self, n=0, prior=None,ucb_percentile = 0.95, discount_coefficient=1, names=None) -> None:
-        self.cmpgns = [BetaBinomial(prior) for _ in range(n)]
-        self.n = n
+# delta wire format: magic, class-name length, arm count, names length, then the class name,
+# the NUL-separated UTF-8 names and a little-endian float64 (2, count) evidence matrix
+_DELTA_HEADER = struct.Struct("<4sHII")
+_DELTA_MAGIC = b"CPD1"
+
+def decode_delta(data):
+    """Split an ``encode_delta`` payload into (class name, names, evidence a, evidence b)."""
+    data = memoryview(data)
+    magic, cls_len, count, names_len = _DELTA_HEADER.unpack_from(data)
+    if magic != _DELTA_MAGIC:
+        raise ValueError("Not a ranker delta")
+    offset = _DELTA_HEADER.size
+    cls = bytes(data[offset:offset + cls_len]).decode("utf-8")
+    offset += cls_len
+    names = bytes(data[offset:offset + names_len]).decode("utf-8").split("\0") if count else []
+    evidence = np.frombuffer(data, dtype="<f8", count=2 * count, offset=offset + names_len).reshape(2, count)
+    return cls, names, evidence[0], evidence[1]
+
+# bounds of the log-hyperparameters searched by ``fit_prior``
+_LOG_PRIOR_BOUNDS = (-10.0, 16.0)
+
+def _compress(x, y):
+    """Collapse repeated (x, y) pairs into unique pairs and multiplicities when both are integral."""
+    if np.array_equal(x, np.rint(x)) and np.array_equal(y, np.rint(y)) and x.min() >= 0 and y.min() >= 0 \
+            and (x.max() + 1) * (y.max() + 1) < 2 ** 62:
+        keys, weights = np.unique(x.astype(np.int64) * int(y.max() + 1) + y.astype(np.int64), return_counts=True)
+        return (keys // int(y.max() + 1)).astype(float), (keys % int(y.max() + 1)).astype(float), weights
+    return x, y, np.ones(len(x))
+
+# upper bound on posterior draws held in memory at once by the sampling methods
+_SAMPLE_CHUNK = 1 << 22
+# measured costs in units of one sampled comparison: a posterior draw, and for the exact Beta win
+# matrix a summed term and an iteration of its Python loop (one per positive on the smaller side
+# of the largest pair)
+_SAMPLE_DRAW_COST = 40
+_EXACT_TERM_COST = 10
+_EXACT_LOOP_COST = 5000
+
+class _ArrayRanker:
+    """Columnar ranker: one slot per arm, posterior parameters kept in two contiguous arrays.
+
+    With ``half_life`` set, observed evidence (not the prior) decays continuously by half every
+    ``half_life`` units of ``clock()``. Decay is lazy: evidence is stored multiplied by a global
+    gain 2 ** ((t - epoch) / half_life) at the time t it is added, and reads divide by the
+    current gain, so an event costs O(1) and no sweep over the arms is needed.
+
+    ``rank_by_mle``/``rank_by_ucb`` keep their scores and ordering between calls. Every write
+    stamps the slots it touches, and the next ranking re-scores only those slots and merges
+    them into the previous order, so ranking cost follows the number of changed arms rather
+    than n. Arms with equal scores may then be ordered differently than by a full sort. Writes
+    must go through the ranker API (not the parameter arrays) to be seen; with ``half_life``
+    every score drifts over time, so rankings are always recomputed.
+
+    ``quantile`` selects how ``rank_by_ucb``/``percentile`` compute posterior quantiles:
+    "exact", "normal" (cube-root approximation) or "table" (precomputed interpolation table),
+    see ``beta_ppf`` and ``gamma_ppf`` for their error bounds. The approximations matter for
+    large rankers, where "exact" inversion dominates the cost of a cold ranking.
+    """
+    def __init__(self, n=0, prior=None, ucb_percentile=0.95, discount_coefficient=1, names=None,
+                 half_life=None, clock=None, quantile="exact") -> None:
+        if names is None:
+            names = [str(i) for i in range(n)]
+        self.names = list(names)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.n = len(self.names)
         self.prior = prior
         self.ucb_percentile = ucb_percentile
+        self.quantile = quantile
         self.discount_coefficient = discount_coefficient
-        if names is None:
-            self.names = [str(i) for i in range(n)]
-        else:
-            self.names = names
+        self._prior_params = self._prior_parameters(prior)
+        self.half_life = half_life
+        self.clock = time.time if clock is None else clock
+        self._epoch = self.clock() if half_life is not None else 0.0
+        self._a = np.empty(self.n)
+        self._b = np.empty(self.n)
+        self._stamp = np.zeros(self.n, dtype=np.int64)
+        self._version = 0
+        self._layout = 0
+        self._rank_cache = {}
+        self.reset()
+    def _prior_parameters(self, prior):
+        raise NotImplementedError
+    def _model(self, a, b):
+        raise NotImplementedError
+    def _reserve(self, capacity):
+        a, b, stamp = np.empty(capacity), np.empty(capacity), np.zeros(capacity, dtype=np.int64)
+        a[:self.n] = self._a[:self.n]
+        b[:self.n] = self._b[:self.n]
+        stamp[:self.n] = self._stamp[:self.n]
+        self._a, self._b, self._stamp = a, b, stamp
+    def _touch(self, slots=slice(None)):
+        """Mark ``slots`` (default: every arm) as changed for the ranking cache."""
+        self._version += 1
+        self._stamp[:self.n][slots] = self._version
+    def _append(self, name):
+        if self.n == len(self._a):
+            self._reserve(max(2 * self.n, 8))
+        i = self.n
+        self._a[i], self._b[i] = self._prior_params
+        self.names.append(name)
+        self._index[name] = i
+        self.n += 1
+        self._touch(i)
+        return i
+    def _slot(self, name):
+        return self._index[name]
+    def _slots(self, keys):
+        """Map an array of arm names (or integer slot indices) to slots, adding unseen names."""
+        keys = np.asarray(keys).ravel()
+        if keys.dtype.kind in "iu":
+            if keys.size and (keys.min() < 0 or keys.max() >= self.n):
+                raise IndexError("Arm index out of range")
+            return keys
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        lookup = np.fromiter((self._index[k] if k in self._index else self._append(k) for k in uniq.tolist()),
+                             dtype=np.intp, count=len(uniq))
+        return lookup[inverse.ravel()]
+    def _scatter_add(self, slots, a, b):
+        g = self._gain()
+        if len(slots) * 8 >= self.n:
+            self._a[:self.n] += np.bincount(slots, weights=a, minlength=self.n) * g
+            self._b[:self.n] += np.bincount(slots, weights=b, minlength=self.n) * g
+            self._touch(slots)
+            return
+        # small batch: sum per touched slot so the cost scales with the batch, not the arm count
+        touched, inverse = np.unique(slots, return_inverse=True)
+        inverse = inverse.ravel()
+        self._a[touched] += np.bincount(inverse, weights=a, minlength=len(touched)) * g
+        self._b[touched] += np.bincount(inverse, weights=b, minlength=len(touched)) * g
+        self._touch(touched)
+    def _gain(self):
+        """Multiplier for evidence added now (1 without decay)."""
+        if self.half_life is None:
+            return 1.0
+        now = self.clock()
+        exponent = (now - self._epoch) / self.half_life
+        if exponent > 64:
+            # re-base the epoch before stored values lose precision
+            pa, pb = self._prior_params
+            scale = 2.0 ** -exponent
+            self._a[:self.n] = pa + (self._a[:self.n] - pa) * scale
+            self._b[:self.n] = pb + (self._b[:self.n] - pb) * scale
+            self._epoch, exponent = now, 0.0
+        return 2.0 ** exponent
+    def _params(self, i=slice(None)):
+        """Current (decayed) parameters of slot ``i``, or of every arm."""
+        if self.half_life is None:
+            return self._a[:self.n][i], self._b[:self.n][i]
+        # _gain() may re-base the stored arrays, so read them only afterwards
+        g = self._gain()
+        a, b = self._a[:self.n][i], self._b[:self.n][i]
+        pa, pb = self._prior_params
+        return pa + (a - pa) / g, pb + (b - pb) / g
+    def _store(self, i, a, b):
+        g = self._gain()
+        pa, pb = self._prior_params
+        self._a[i], self._b[i] = pa + (a - pa) * g, pb + (b - pb) * g
+        self._touch(i)
+    @property
+    def cmpgns(self):
+        return [self._model(a, b) for a, b in zip(*self._params())]
+    def __len__(self):
+        return self.n
+    def __contains__(self, name):
+        return name in self._index
     def __getitem__(self, name):
-        i = self.names.index(name)
-        return self.cmpgns[i]
+        return self._model(*self._params(self._slot(name)))
     def __setitem__(self, name, value):
         try:
-            i = self.names.index(name)
-        except ValueError:
-            self.names.append(name)
-            self.cmpgns.append(BetaBinomial(self.prior))
-            self.n += 1
-            i = self.n - 1
-        p,n = value
-        self.cmpgns[i].positives = p
-        self.cmpgns[i].negatives = n
+            i = self._slot(name)
+        except KeyError:
+            i = self._append(name)
+        self._store(i, *self._as_params(value))
     def __delitem__(self, name):
-        i = self.names.index(name)
-        del self.cmpgns[i]
-        del self.names[i]
+        # swap-remove: the last arm takes over the freed slot, so rankings of ties may reorder
+        i = self._index.pop(name)
+        last = self.n - 1
+        if i != last:
+            self._a[i], self._b[i] = self._a[last], self._b[last]
+            self.names[i] = self.names[last]
+            self._index[self.names[i]] = i
+        self.names.pop()
         self.n -= 1
+        self._layout += 1
     def __str__(self):
         return str(self.cmpgns)
     def reset(self):
-        self.cmpgns = [BetaBinomial(self.prior) for _ in range(self.n)]
+        self._a[:self.n], self._b[:self.n] = self._prior_params
+        self._touch()
+    def _evidence(self):
+        """Observed (decayed) evidence per arm: the parameters minus the prior."""
+        a, b = self._params()
+        pa, pb = self._prior_params
+        # arms at the prior up to rounding (e.g. after fit_prior shifted it) have no evidence
+        return (np.where(np.isclose(a, pa, rtol=1e-12, atol=0), 0.0, a - pa),
+                np.where(np.isclose(b, pb, rtol=1e-12, atol=0), 0.0, b - pb))
+    def fit_prior(self, method="mle"):
+        """Empirical Bayes: estimate the prior from the evidence of every arm and swap it in.
+
+        method:
+          "moments" - method of moments on the per-arm rates, net of their sampling noise.
+          "mle"     - maximum marginal likelihood (Beta-Binomial / Gamma-exponential), started
+                      from the moments estimate. Arms with the same counts are evaluated once.
+        Arms without evidence are ignored. The arms keep their evidence and only the prior part
+        of their parameters changes, so this can be re-run periodically; returns the new prior
+        parameters, which also become ``prior``. Raises ``ValueError``, leaving the ranker
+        unchanged, if any arm has fallen below the prior (``discount`` scales the prior too) or no
+        valid prior fits the evidence -- including when the arms vary no more than their sampling
+        noise (typical with only a few arms), where the estimate would run to an arbitrarily
+        strong prior that swamps every arm.
+        """
+        if method not in ("mle", "moments"):
+            raise ValueError("method must be either 'mle' or 'moments'")
+        a, b = self._evidence()
+        if np.any(a < 0) or np.any(b < 0):
+            # discount() scales the prior along with the evidence, which can leave less than the prior
+            raise ValueError("Negative evidence (parameters below the prior, e.g. after discount()); "
+                             "cannot fit a prior")
+        keep = (a > 0) | (b > 0)
+        if np.count_nonzero(keep) < 2:
+            raise ValueError("Need evidence on at least two arms to fit a prior")
+        x, y, w = _compress(a[keep], b[keep])
+        lo, hi = _LOG_PRIOR_BOUNDS
+        with np.errstate(all="ignore"):
+            start = np.asarray(self._moments(x, y, w), dtype=float)
+        if not np.all(start > 0):
+            raise ValueError("The evidence does not determine a prior (e.g. no arm has any positives)")
+        if not np.all(np.isfinite(start)):
+            raise ValueError("The arms vary no more than their sampling noise; too few arms or too little "
+                             "evidence to fit a prior")
+        start = np.clip(np.log(start), lo, hi)
+        if method == "mle":
+            start = optimize.minimize(self._marginal, start, args=(x, y, w), jac=True, method="L-BFGS-B",
+                                      bounds=[(lo, hi)] * 2).x
+        if np.any(start < lo + 1) or np.any(start > hi - 1):
+            # a runaway estimate would swamp (or erase) every arm's own evidence
+            raise ValueError("The fitted prior runs to the search bounds; too few arms or too little "
+                             "evidence to fit a prior")
+        new_a, new_b = np.exp(start)
+        pa, pb = self._prior_params
+        # stored parameters are prior + scaled evidence, so shifting them swaps the prior in place
+        shifted_a, shifted_b = self._a[:self.n] + (new_a - pa), self._b[:self.n] + (new_b - pb)
+        if not (np.all(np.isfinite(start)) and np.all(shifted_a > 0) and np.all(shifted_b > 0)):
+            raise ValueError("Fitting the prior failed; the ranker is unchanged")
+        self._a[:self.n], self._b[:self.n] = shifted_a, shifted_b
+        self._prior_params = (float(new_a), float(new_b))
+        self.prior = self._prior_params
+        self._touch()
+        return self._prior_params
+    def encode_delta(self, reset=False):
+        """Serialize the evidence of every arm that has any into a compact binary delta.
+
+        With ``reset=True`` those arms go back to the prior, so successive deltas carry only
+        what was observed in between (the worker side of a sharded setup). Deltas are applied
+        with ``merge``; names must be str without NUL characters.
+        """
+        a, b = self._evidence()
+        touched = np.flatnonzero((a != 0) | (b != 0))
+        if not all(isinstance(self.names[i], str) for i in touched):
+            raise TypeError("Deltas carry arm names as text; every arm name must be a str")
+        cls = type(self).__name__.encode("utf-8")
+        names = "\0".join(self.names[i] for i in touched).encode("utf-8")
+        evidence = np.stack([a[touched], b[touched]]).astype("<f8")
+        if reset and touched.size:
+            self._a[touched], self._b[touched] = self._prior_params
+            self._touch(touched)
+        return _DELTA_HEADER.pack(_DELTA_MAGIC, len(cls), touched.size, len(names)) + cls + names + \
+            evidence.tobytes()
+    def merge(self, other):
+        """Add the evidence of another ranker of the same class, or of an ``encode_delta``
+        payload, arm by arm; unseen arms are added. Priors are not merged (each side's
+        evidence is relative to its own prior), and with ``half_life`` the merged evidence
+        counts as observed now."""
+        if isinstance(other, (bytes, bytearray, memoryview)):
+            cls, names, a, b = decode_delta(other)
+        else:
+            other = other.snapshot() if hasattr(other, "snapshot") else other
+            cls, names, (a, b) = type(other).__name__, other.names, other._evidence()
+        if cls != type(self).__name__:
+            raise TypeError("Cannot merge a {} into a {}".format(cls, type(self).__name__))
+        if len(names):
+            # names are matched as they are (never coerced to str, nor taken as slot indices)
+            index = self._index
+            slots = np.fromiter((index[k] if k in index else self._append(k) for k in names), dtype=np.intp,
+                                count=len(names))
+            self._scatter_add(slots, a, b)
+        return self
+    def __iadd__(self, other):
+        return self.merge(other)
+    def save(self, path):
+        """Write a snapshot directory: ``meta.json`` plus the names and a (2, n) parameter array.
+
+        A snapshot is never modified in place, since other processes may have it memory-mapped:
+        the arrays go to new uniquely named files and ``meta.json``, which names them, is
+        swapped in atomically with ``os.replace``, so ``load`` never sees a partial snapshot.
+        Files of the previous snapshot are removed afterwards (mapped pages stay valid). Use a
+        single writer per directory.
+        """
+        os.makedirs(path, exist_ok=True)
+        token = os.urandom(8).hex()
+        files = {"names_file": "names-{}.npy".format(token), "params_file": "params-{}.npy".format(token)}
+        np.save(os.path.join(path, files["names_file"]), np.asarray(self.names), allow_pickle=False)
+        np.save(os.path.join(path, files["params_file"]), np.stack([self._a[:self.n], self._b[:self.n]]))
+        meta = {"class": type(self).__name__, "prior": self.prior, "prior_params": list(self._prior_params),
+                "ucb_percentile": self.ucb_percentile, "discount_coefficient": self.discount_coefficient,
+                "quantile": self.quantile, "half_life": self.half_life, "epoch": self._epoch, **files}
+        tmp = os.path.join(path, "meta-{}.json.tmp".format(token))
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(path, "meta.json"))
+        for name in os.listdir(path):
+            if name.endswith(".npy") and name not in files.values():
+                try:
+                    os.remove(os.path.join(path, name))
+                except FileNotFoundError:
+                    pass
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a snapshot written by ``save``.
+
+        With ``mmap=True`` the parameters are memory-mapped copy-on-write: processes share the
+        file's pages, and local updates never reach the file (or other processes). A ``save``
+        to the same directory meanwhile does not affect an already loaded ranker.
+        """
+        while True:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            if meta["class"] != cls.__name__:
+                raise TypeError("Snapshot holds a {}, not a {}".format(meta["class"], cls.__name__))
+            try:
+                # snapshots written before the atomic format used fixed file names
+                params = np.load(os.path.join(path, meta.get("params_file", "params.npy")),
+                                 mmap_mode="c" if mmap else None)
+                names = np.load(os.path.join(path, meta.get("names_file", "names.npy"))).tolist()
+                break
+            except FileNotFoundError:
+                # a concurrent save replaced the snapshot between reading meta.json and its files
+                if "params_file" not in meta:
+                    raise
+        self = cls.__new__(cls)
+        self.names = names
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.n = len(self.names)
+        self.prior = tuple(meta["prior"]) if isinstance(meta["prior"], list) else meta["prior"]
+        self._prior_params = tuple(meta["prior_params"])
+        self.ucb_percentile = meta["ucb_percentile"]
+        self.quantile = meta.get("quantile", "exact")
+        self.discount_coefficient = meta["discount_coefficient"]
+        self.half_life = meta.get("half_life")
+        self.clock = time.time
+        self._epoch = meta.get("epoch", 0.0)
+        self._a, self._b = params[0], params[1]
+        self._stamp = np.zeros(self.n, dtype=np.int64)
+        self._version = self._layout = 0
+        self._rank_cache = {}
+        return self
+    def copy(self, names_from=None):
+        """Independent copy of the ranker state.
+
+        ``names_from`` is an earlier copy whose names and index are known to still be valid
+        (no arm added or removed since); they are shared instead of copied.
+        """
+        ret = copy.copy(self)
+        ret._a = self._a[:self.n].copy()
+        ret._b = self._b[:self.n].copy()
+        ret._stamp = self._stamp[:self.n].copy()
+        if names_from is None:
+            ret.names = list(self.names)
+            ret._index = dict(self._index)
+            ret._rank_cache = {}
+        else:
+            # cache entries are never modified in place, so the copies can share them
+            ret.names, ret._index = names_from.names, names_from._index
+            ret._rank_cache = dict(names_from._rank_cache)
+        return ret
+    def discount(self):
+        if self.half_life is None:
+            self._a[:self.n] *= self.discount_coefficient
+            self._b[:self.n] *= self.discount_coefficient
+        else:
+            # scale the decayed parameters, then store them back the way _store does
+            a, b = self._params()
+            g = self._gain()
+            pa, pb = self._prior_params
+            self._a[:self.n] = pa + (a * self.discount_coefficient - pa) * g
+            self._b[:self.n] = pb + (b * self.discount_coefficient - pb) * g
+        self._touch()
+        return self
+    def _rank(self, scores, k=None):
+        """Names in ascending score order; with ``k`` only the ``k`` best (the tail of the full ranking)."""
+        if k is None or k >= self.n:
+            order = np.argsort(scores, kind="stable")
+        elif k <= 0:
+            return []
+        else:
+            top = np.argpartition(scores, self.n - k)[self.n - k:]
+            order = top[np.lexsort((top, scores[top]))]
+        return [self.names[i] for i in order]
+    def _ranked_order(self, key, score):
+        """Slots in ascending order of ``score(a, b)``, reusing the cached ordering for ``key``."""
+        n = self.n
+        if self.half_life is not None:
+            return np.argsort(score(*self._params()), kind="stable")
+        cached = self._rank_cache.get(key)
+        if cached is not None and cached[1] == self._layout:
+            version, _, scores, order = cached
+            dirty = np.flatnonzero(self._stamp[:n] > version)
+        if cached is None or cached[1] != self._layout or len(dirty) > n // 2:
+            scores = score(*self._params())
+            order = np.argsort(scores, kind="stable")
+        elif len(dirty):
+            scores = np.concatenate([scores[:min(len(scores), n)], np.empty(max(n - len(scores), 0))])
+            scores[dirty] = score(*self._params(dirty))
+            changed = np.zeros(n, dtype=bool)
+            changed[dirty] = True
+            order = order[~changed[order]]
+            # both runs are sorted, so the stable (tim)sort merges them in linear time
+            merged = np.concatenate([order, dirty[np.argsort(scores[dirty], kind="stable")]])
+            order = merged[np.argsort(scores[merged], kind="stable")]
+        self._rank_cache[key] = (self._version, self._layout, scores, order)
+        return order
+    def _ranked(self, order, k=None):
+        if k is not None:
+            order = order[max(len(order) - k, 0):] if k > 0 else order[:0]
+        return [self.names[i] for i in order]
+    def rank_by_mle(self, k=None):
+        return self._ranked(self._ranked_order("mle", self._mean), k)
+    def rank_by_ucb(self, k=None):
+        q = self.ucb_percentile
+        return self._ranked(self._ranked_order(("ucb", q, self.quantile), lambda a, b: self._ppf(q, a, b)), k)
+    def mean(self):
+        return self._mean(*self._params())
+    def percentile(self, p):
+        return self._ppf(p, *self._params())
+    def _draws(self, rng, rows, params=None):
+        """Yield posterior draws for every arm (or for the arms of ``params``), ``rows`` in total,
+        in chunks of shape (m, n)."""
+        a, b = self._params() if params is None else params
+        step = max(1, _SAMPLE_CHUNK // max(len(a), 1))
+        for start in range(0, rows, step):
+            yield self._sample(rng, a, b, (min(step, rows - start), len(a)))
+    def pairwise_win_matrix(self, method="auto", n_samples=4000, rng=None):
+        """(n, n) matrix of P(arm i > arm j) under the posteriors, rows and columns in ``names`` order.
+
+        method:
+          "exact" - closed form (Gamma rates: always; Beta: integer positives, see ``beta_prob_greater``).
+          "mc"    - ``n_samples`` shared posterior draws compared in bounded-memory chunks; the error
+                    is ~0.5/sqrt(n_samples) for n ** 2 * n_samples comparisons.
+          "auto"  - "exact" when it is available and estimated to be cheaper than "mc". The Beta
+                    sum is a Python loop over the smaller positive count of each pair, so large
+                    counts (thousands of positives) are usually sampled.
+        The diagonal is zero.
+        """
+        if method not in ("auto", "exact", "mc"):
+            raise ValueError("method must be one of 'auto', 'exact' or 'mc'")
+        ret = None
+        if method != "mc":
+            ret = self._win_matrix(*self._params(), None if method == "exact" else n_samples)
+            if ret is None and method == "exact":
+                raise ValueError("No closed form for these posteriors, use method='mc'")
+        if ret is None:
+            rng = np.random.default_rng(rng)
+            wins = np.zeros((self.n, self.n), dtype=np.int64)
+            for draws in self._draws(rng, n_samples):
+                # one arm per row, so each comparison reduces along contiguous memory
+                draws = np.ascontiguousarray(draws.T)
+                for j in range(self.n):
+                    wins[:, j] += np.count_nonzero(draws > draws[j], axis=1)
+            ret = wins / n_samples
+        np.fill_diagonal(ret, 0.0)
+        return ret
+    def prob_best(self, method="auto", n_samples=20000, rng=None):
+        """P(arm i has the highest parameter) for every arm, in ``names`` order.
+
+        Exact for two arms where ``pairwise_win_matrix`` is; otherwise estimated from ``n_samples``
+        shared posterior draws (chunked, so memory stays bounded). Only arms whose 1 - 1e-6
+        quantile reaches the highest 1e-6 quantile are sampled: the others win with probability
+        below 2e-6 and are reported as 0.
+        """
+        if self.n == 2 and method != "mc":
+            p = self.pairwise_win_matrix(method, n_samples, rng)[0, 1]
+            return np.array([p, 1.0 - p])
+        if method == "exact":
+            raise ValueError("No closed form for more than two arms, use method='mc'")
+        ret = np.zeros(self.n)
+        if self.n == 0:
+            return ret
+        a, b = self._params()
+        # the approximate quantile engines are not valid this far in the tails
+        alive = np.flatnonzero(self._ppf(1 - 1e-6, a, b, "exact") >= self._ppf(1e-6, a, b, "exact").max())
+        rng = np.random.default_rng(rng)
+        draws = self._draws(rng, n_samples, (a[alive], b[alive]))
+        ret[alive] = sum(np.bincount(d.argmax(axis=1), minlength=len(alive)) for d in draws) / n_samples
+        return ret
+    def rank_by_thompson(self, k=None, n_draws=1, rng=None):
+        """Rank by the average of ``n_draws`` posterior draws per arm (``n_draws=1`` is plain Thompson sampling)."""
+        rng = np.random.default_rng(rng)
+        scores = sum(draws.sum(axis=0) for draws in self._draws(rng, n_draws)) / n_draws
+        return self._rank(scores, k)
+    def select(self, batch_size=1, rng=None):
+        """Thompson-sample one arm for each of ``batch_size`` requests."""
+        if self.n == 0:
+            raise ValueError("Cannot select from an empty ranker")
+        rng = np.random.default_rng(rng)
+        picks = np.concatenate([draws.argmax(axis=1) for draws in self._draws(rng, batch_size)])
+        return [self.names[i] for i in picks]
+
+
+class BetaBinomialRanker(_ArrayRanker):
+    @property
+    def positives(self):
+        return self._params()[0]
+    @property
+    def negatives(self):
+        return self._params()[1]
+    def _prior_parameters(self, prior):
+        model = BetaBinomial(*prior) if isinstance(prior, tuple) else BetaBinomial(prior)
+        return model.positives, model.negatives
+    def _model(self, a, b):
+        model = BetaBinomial()
+        model.positives, model.negatives = float(a), float(b)
+        return model
+    def _as_params(self, value):
+        if isinstance(value, BetaBinomial):
+            return value.positives, value.negatives
+        p, n = value
+        return p, n
     def update(self, name, p, n):
-        i = self.names.index(name)
-        self.cmpgns[i] = self.cmpgns[i].update(p,n)
+        i = self._slot(name)
+        g = self._gain()
+        self._a[i] += p * g
+        self._b[i] += n * g
+        self._touch(i)
     def update_all(self, data: List[Tuple[int, int]]):
         assert len(data) == self.n, "Data must have the same number of campaigns as the model"
-        for i, d in enumerate(data):
-            p,n = d
-            self.cmpgns[i] = self.cmpgns[i].update(p,n)
-    def rank_by_mle(self):
-        lst = sorted([(c.mean(), i) for i,c in enumerate(self.cmpgns)])
-        return [self.names[i] for _,i in lst]
-    def rank_by_ucb(self):
-        lst = sorted([(c.percentile(self.ucb_percentile), i) for i,c in enumerate(self.cmpgns)])
-        return [self.names[i] for _,i in lst]
-    def discount(self):
-        for i in range(self.n):
-            self.cmpgns[i].positives *= self.discount_coefficient
-            self.cmpgns[i].negatives *= self.discount_coefficient
-        return self
+        data = np.asarray(data, dtype=float).reshape(self.n, 2) * self._gain()
+        self._a[:self.n] += data[:, 0]
+        self._b[:self.n] += data[:, 1]
+        self._touch()
+    def ingest(self, keys, positives, negatives):
+        """Apply a batch of ``(key, p, n)`` events; keys may repeat and are names or integer slots."""
+        slots = self._slots(keys)
+        positives = np.broadcast_to(np.asarray(positives, dtype=float), slots.shape)
+        negatives = np.broadcast_to(np.asarray(negatives, dtype=float), slots.shape)
+        self._scatter_add(slots, positives, negatives)
+    @staticmethod
+    def _mean(a, b):
+        return a / (a + b)
+    def _ppf(self, p, a, b, method=None):
+        return beta_ppf(p, a, b, method or self.quantile)
+    @staticmethod
+    def _moments(s, f, w):
+        n = s + f
+        m = (w * s).sum() / (w * n).sum()
+        spread = (w * (s / n - m) ** 2).sum() / w.sum()
+        noise = m * (1 - m) * (w / n).sum() / w.sum()
+        if spread <= noise:
+            # no overdispersion: the rates look identical and the prior strength is unbounded
+            return np.inf, np.inf
+        strength = m * (1 - m) / (spread - noise) - 1
+        return m * strength, (1 - m) * strength
+    @staticmethod
+    def _marginal(log_params, s, f, w):
+        """Negative Beta-Binomial log marginal likelihood and its gradient in log-parameters."""
+        a, b = np.exp(log_params)
+        nll = -(w * (fn.betaln(s + a, f + b) - fn.betaln(a, b))).sum()
+        common = fn.digamma(s + f + a + b) - fn.digamma(a + b)
+        grad_a = -(w * (fn.digamma(s + a) - fn.digamma(a) - common)).sum()
+        grad_b = -(w * (fn.digamma(f + b) - fn.digamma(b) - common)).sum()
+        return nll, np.array([a * grad_a, b * grad_b])
+    def _win_matrix(self, a, b, n_samples):
+        rounded = np.rint(a)
+        if not np.allclose(a, rounded, rtol=0, atol=1e-9):
+            return None
+        # sum over the arm with fewer positives and get the other half by symmetry
+        i, j = np.nonzero(rounded[:, np.newaxis] <= rounded)
+        # with n_samples ("auto"), sum only if that is estimated to beat sampling
+        cost = _EXACT_TERM_COST * rounded[i].sum() + _EXACT_LOOP_COST * rounded[i].max(initial=0)
+        if n_samples is not None and cost > n_samples * len(a) * (len(a) + _SAMPLE_DRAW_COST):
+            return None
+        ret = np.empty((len(a), len(a)))
+        ret[j, i] = 1.0 - beta_prob_greater(rounded[i], b[i], rounded[j], b[j])
+        ret[i, j] = 1.0 - ret[j, i]
+        return ret
+    @staticmethod
+    def _sample(rng, a, b, size):
+        return rng.beta(a, b, size=size)
 
-class GammaExponentialRanker:
-    def __init__(self, n=0, prior=None,ucb_percentile = 0.95, discount_coefficient=1, names=None) -> None:
-        self.cmpgns = [GammaExponential(prior) for _ in range(n)]
-        self.n = n
-        self.prior = prior
-        self.ucb_percentile = ucb_percentile
-        self.discount_coefficient = discount_coefficient
-        if names is None:
-            self.names = [str(i) for i in range(n)]
-        else:
-            self.names = names
-    def __getitem__(self, name):
-        i = self.names.index(name)
-        return self.cmpgns[i]
-    def __setitem__(self, name, value):
-        try:
-            i = self.names.index(name)
-        except ValueError:
-            self.names.append(name)
-            self.cmpgns.append(GammaExponential(self.prior))
-            self.n += 1
-            i = self.n - 1
-        a,b = value
-        self.cmpgns[i].alpha = a
-        self.cmpgns[i].beta = b
-    def __delitem__(self, name):
-        i = self.names.index(name)
-        del self.cmpgns[i]
-        del self.names[i]
-        self.n -= 1
-    def __str__(self):
-        return str(self.cmpgns)
-    def reset(self):
-        self.cmpgns = [GammaExponential(self.prior) for _ in range(self.n)]
+
+class GammaExponentialRanker(_ArrayRanker):
+    @property
+    def alpha(self):
+        return self._params()[0]
+    @property
+    def beta(self):
+        return self._params()[1]
+    def _prior_parameters(self, prior):
+        if prior is None:
+            return 1.0, 1.0
+        model = GammaExponential(*prior) if isinstance(prior, tuple) else GammaExponential(prior)
+        return model.alpha, model.beta
+    def _model(self, a, b):
+        return GammaExponential(float(a), float(b))
+    def _as_params(self, value):
+        if isinstance(value, GammaExponential):
+            return value.alpha, value.beta
+        a, b = value
+        return a, b
     def update(self, name, data):
-        i = self.names.index(name)
-        self.cmpgns[i] = self.cmpgns[i].update(data)
+        i = self._slot(name)
+        data = np.asarray(data, dtype=float)
+        g = self._gain()
+        self._a[i] += data.size * g
+        self._b[i] += data.sum() * g
+        self._touch(i)
     def update_all(self, data: List[List[int]]):
         assert len(data) == self.n, "Data must have the same number of campaigns as the model"
-        for i, d in enumerate(data):
-            self.cmpgns[i] = self.cmpgns[i].update(d)
-    def rank_by_mle(self):
-        lst = sorted([(c.mean(), i) for i,c in enumerate(self.cmpgns)])
-        return [self.names[i] for _,i in lst]
-    def rank_by_ucb(self):
-        lst = sorted([(c.percentile(self.ucb_percentile), i) for i,c in enumerate(self.cmpgns)])
\ No newline at end of file
+        data = [np.asarray(d, dtype=float).ravel() for d in data]
+        lengths = np.fromiter(map(len, data), dtype=int, count=self.n)
+        owners = np.repeat(np.arange(self.n), lengths)
+        g = self._gain()
+        self._a[:self.n] += lengths * g
+        self._b[:self.n] += np.bincount(owners, weights=np.concatenate(data) if data else None, minlength=self.n) * g
+        self._touch()
+    def ingest(self, keys, durations, counts=None):
+        """Apply a batch of ``(key, duration)`` events; keys may repeat and are names or integer slots.
+
+        With ``counts``, each entry is pre-aggregated: ``durations`` holds the sum of ``counts`` events.
+        """
+        slots = self._slots(keys)
+        durations = np.broadcast_to(np.asarray(durations, dtype=float), slots.shape)
+        if counts is not None:
+            counts = np.broadcast_to(np.asarray(counts, dtype=float), slots.shape)
+        self._scatter_add(slots, counts, durations)
+    @staticmethod
+    def _mean(a, b):
+        return a / b
+    def _ppf(self, p, a, b, method=None):
+        return gamma_ppf(p, a, 1.0 / b, method or self.quantile)
+    @staticmethod
+    def _moments(k, t, w):
+        # mean durations t / k estimate 1 / rate, which is InvGamma(a, b) distributed:
+        # E[1 / rate] = b / (a - 1) and E[1 / rate ** 2] / E[1 / rate] ** 2 = (a - 1) / (a - 2)
+        keep = (k > 0) & (t > 0)
+        k, tau, w = k[keep], t[keep] / k[keep], w[keep]
+        mean = (w * tau).sum() / w.sum()
+        ratio = (w * tau ** 2 * k / (k + 1)).sum() / w.sum() / mean ** 2
+        if not ratio > 1:
+            # no overdispersion: the rates look identical and the prior strength is unbounded
+            return np.inf, np.inf
+        a = (2 * ratio - 1) / (ratio - 1)
+        return a, mean * (a - 1)
+    @staticmethod
+    def _marginal(log_params, k, t, w):
+        """Negative Gamma-exponential log marginal likelihood and its gradient in log-parameters."""
+        a, b = np.exp(log_params)
+        nll = -(w * (a * np.log(b) + fn.gammaln(a + k) - fn.gammaln(a) - (a + k) * np.log(b + t))).sum()
+        grad_a = -(w * (np.log(b) + fn.digamma(a + k) - fn.digamma(a) - np.log(b + t))).sum()
+        grad_b = -(w * (a / b - (a + k) / (b + t))).sum()
+        return nll, np.array([a * grad_a, b * grad_b])
+    @staticmethod
+    def _win_matrix(a, b, n_samples):
+        return gamma_prob_greater(a[:, np.newaxis], b[:, np.newaxis], a, b)
+    @staticmethod
+    def _sample(rng, a, b, size):
+        return rng.gamma(a, 1.0 / b, size=size)
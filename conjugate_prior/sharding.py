@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import threading
+import zlib
+from multiprocessing.connection import Client, Listener
+import numpy as np
+
+
+def shard_of(names, n_shards):
+    """Stable shard index (CRC-32 of the UTF-8 name) of every arm name, as an int array."""
+    names = np.asarray(names, dtype=str).ravel()
+    crc = np.fromiter((zlib.crc32(name.encode("utf-8")) for name in names.tolist()), dtype=np.int64,
+                      count=names.size)
+    return crc % n_shards
+
+
+def push_delta(ranker, conn):
+    """Send ``ranker``'s evidence over ``conn`` to a ``DeltaCoordinator`` and reset it to the
+    prior; returns once the coordinator has merged it."""
+    conn.send_bytes(ranker.encode_delta(reset=True))
+    conn.recv_bytes()
+
+
+class DeltaCoordinator:
+    """Merges ranker deltas (``encode_delta`` payloads) sent over a local socket into ``ranker``.
+
+    Every received delta is merged under ``lock`` and acknowledged, so a sender knows its
+    evidence is visible once ``push_delta`` returns. Wrap the ranker in a ``ConcurrentRanker``
+    to read it while deltas arrive (its reads may lag by up to ``max_staleness``); otherwise
+    hold ``lock`` while reading.
+
+        with DeltaCoordinator(BetaBinomialRanker(prior=0.1)) as coordinator:
+            with ShardedIngest(coordinator, n_workers=4) as workers:
+                workers.ingest(names, clicks, skips)
+            print(coordinator.ranker.rank_by_ucb(k=10))
+    """
+    def __init__(self, ranker, address=None, authkey=None):
+        self.ranker = ranker
+        self.authkey = os.urandom(16) if authkey is None else authkey
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+        self.lock = threading.Lock()
+        self._closing = False
+        self._threads = []
+        self.deltas = 0
+        self.bytes_received = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if not self._threads:
+            self._threads.append(threading.Thread(target=self._accept, daemon=True))
+            self._threads[0].start()
+        return self
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closing:
+                    return
+                continue
+            if self._closing:
+                conn.close()
+                return
+            thread = threading.Thread(target=self._serve, args=(conn,), daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    data = conn.recv_bytes()
+                except (OSError, EOFError):
+                    return
+                with self.lock:
+                    self.ranker.merge(data)
+                    self.deltas += 1
+                    self.bytes_received += len(data)
+                conn.send_bytes(b"")
+
+    def close(self):
+        """Stop accepting connections and wait for the connected senders to disconnect."""
+        if self._closing:
+            return
+        self._closing = True
+        if self._threads:
+            # accept() does not notice the listener closing, so wake it with a connection
+            Client(self.address, authkey=self.authkey).close()
+        for thread in self._threads:
+            thread.join()
+        self._listener.close()
+
+
+def _work(cls, kwargs, inbox, address, authkey, flush_every):
+    ranker = cls(**kwargs)
+    with Client(address, authkey=authkey) as conn:
+        pending = 0
+        while True:
+            batch = inbox.get()
+            if batch is not None:
+                ranker.ingest(*batch)
+                pending += 1
+            if pending and (batch is None or pending >= flush_every):
+                push_delta(ranker, conn)
+                pending = 0
+            if batch is None:
+                return
+
+
+class ShardedIngest:
+    """Parallel ``ingest`` through ``n_workers`` processes feeding a ``DeltaCoordinator``.
+
+    Events are partitioned by ``shard_of`` their arm name, so every worker owns a disjoint set of
+    arms. A worker ingests into its own ranker (same class and prior as the coordinator's, no
+    decay: the coordinator's ``half_life`` applies from merge time) and pushes a delta every
+    ``flush_every`` batches and on ``close``, which returns once everything has been merged.
+    Keys must be arm names, not slot indices.
+    """
+    def __init__(self, coordinator, n_workers=None, flush_every=16, max_pending=64, context=None):
+        ranker = getattr(coordinator.ranker, "ranker", coordinator.ranker)
+        self.n_workers = n_workers or os.cpu_count() or 1
+        ctx = multiprocessing.get_context(context)
+        kwargs = {"prior": ranker.prior}
+        self._inboxes = [ctx.Queue(max_pending) for _ in range(self.n_workers)]
+        self._workers = [ctx.Process(target=_work, daemon=True,
+                                     args=(type(ranker), kwargs, inbox, coordinator.address,
+                                           coordinator.authkey, flush_every))
+                         for inbox in self._inboxes]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ingest(self, keys, *columns):
+        """Same arguments as the ranker's ``ingest``; each worker receives its share of the batch."""
+        keys = np.asarray(keys).ravel()
+        if keys.dtype.kind in "iu":
+            raise TypeError("Sharded ingest needs arm names, not slot indices")
+        columns = [None if c is None else np.broadcast_to(np.asarray(c), keys.shape) for c in columns]
+        shards = shard_of(keys, self.n_workers)
+        order = np.argsort(shards, kind="stable")
+        bounds = np.searchsorted(shards[order], np.arange(self.n_workers + 1))
+        for inbox, start, stop in zip(self._inboxes, bounds[:-1], bounds[1:]):
+            if stop > start:
+                rows = order[start:stop]
+                inbox.put((keys[rows],) + tuple(None if c is None else c[rows] for c in columns))
+
+    def close(self):
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for worker in self._workers:
+            worker.join()
+        if any(worker.exitcode for worker in self._workers):
+            raise RuntimeError("A sharded ingest worker failed")
@@ -0,0 +1,99 @@
+import numpy as np
+
+
+def iter_chunks(data, chunk_size=1 << 16):
+    """Yield ``data`` as flat NumPy arrays with bounded memory.
+
+    Arrays, lists and tuples are yielded whole and bytes-like objects as one uint8 value per
+    byte. Any other iterable (e.g. a generator) is consumed item by item: items that are
+    themselves chunks are expanded recursively and runs of scalars are batched into arrays of
+    ``chunk_size``.
+    """
+    if isinstance(data, np.ndarray):
+        yield data.ravel()
+    elif isinstance(data, (bytes, bytearray, memoryview)):
+        yield np.frombuffer(data, dtype=np.uint8)
+    elif isinstance(data, (list, tuple)):
+        yield np.asarray(data).ravel()
+    else:
+        buffer = []
+        for item in data:
+            if np.ndim(item) == 0 and not isinstance(item, (bytes, bytearray, memoryview)):
+                buffer.append(item)
+                if len(buffer) >= chunk_size:
+                    yield np.asarray(buffer)
+                    buffer = []
+            else:
+                yield from iter_chunks(item, chunk_size)
+        if buffer:
+            yield np.asarray(buffer)
+
+
+class SufficientStats:
+    """Mergeable one-pass summary of a sample: count, mean, sum of squared deviations
+    and, when ``shape`` is given, the sum of ``x ** shape``.
+
+    With ``log=True`` every value is log-transformed before it is accumulated
+    (as required by ``NormalLogNormalKnownVar``).
+    """
+    __slots__ = ["count", "mean", "m2", "power_sum", "shape", "log"]
+
+    def __init__(self, shape=None, log=False):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.power_sum = 0.0
+        self.shape = shape
+        self.log = log
+
+    @classmethod
+    def from_iterable(cls, iterable, chunk_size=1 << 16, **kwargs):
+        """Build from an iterable of chunks (array-likes) and/or scalars with bounded memory."""
+        ret = cls(**kwargs)
+        for chunk in iter_chunks(iterable, chunk_size):
+            ret.add(chunk)
+        return ret
+
+    @property
+    def sum(self):
+        return self.mean * self.count
+
+    @property
+    def var(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    def add(self, data):
+        data = np.asarray(data, dtype=float).ravel()
+        if data.size == 0:
+            return self
+        if self.log:
+            data = np.log(data)
+        other = SufficientStats(self.shape, self.log)
+        other.count = data.size
+        other.mean = data.mean()
+        other.m2 = np.square(data - other.mean).sum()
+        if self.shape is not None:
+            other.power_sum = np.power(data, self.shape).sum()
+        return self.merge(other)
+
+    def merge(self, other):
+        if not isinstance(other, SufficientStats):
+            raise TypeError("Unsupported type")
+        if (other.shape, other.log) != (self.shape, self.log):
+            raise ValueError("Cannot merge statistics with a different shape or transform")
+        n = self.count + other.count
+        if n == 0:
+            return self
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / n
+        self.power_sum += other.power_sum
+        self.count = n
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        ret = SufficientStats(self.shape, self.log)
+        return ret.merge(self).merge(other)